@@ -0,0 +1,185 @@
+import os, fnmatch, contextlib, tracemalloc
+
+from camera import Camera
+
+
+# ----------- Allocation profiling -----------
+
+# An AllocationProfile attributes the memory allocated while it is running to camera actions. For each action it
+# records:
+#
+# * peak: the most memory in use at any point during the action, over what was in use when it started - the
+#   transient allocations, such as the strings formatted for prints and the tuples built by metering, that are
+#   freed again before the action is over
+# * blocks and size: the memory allocated during the action that is still in use at the end of it, and the source
+#   lines that allocated it
+#
+# Memory allocated by tracemalloc itself and by this module is left out.
+class AllocationProfile:
+
+    def __init__(self):
+        self.actions = {}
+        self.filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, contextlib.__file__),
+        ]
+        self.started = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started = True
+        # filtering compiles and caches the filters' patterns; do it now, so that it isn't counted in the first
+        # action
+        for f in self.filters:
+            fnmatch.fnmatch(__file__, f.filename_pattern)
+        return self
+
+    def __exit__(self, *exception):
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    def snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self.filters)
+
+    # Attributes the allocations made in the body of the with statement to the named action.
+    @contextlib.contextmanager
+    def action(self, name):
+        if not tracemalloc.is_tracing():
+            raise self.NotTracing("Allocations can only be profiled inside 'with AllocationProfile()'")
+
+        before = self.snapshot()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            differences = self.snapshot().compare_to(before, "lineno")
+            allocations = self.actions.get(name) or self.actions.setdefault(name, ActionAllocations(name))
+            allocations.add(peak, differences)
+
+    class NotTracing(Exception):
+        pass
+
+    # The actions, ranked by their peak allocation per call, with the lines retaining the most memory in each.
+    def report(self, lines=3):
+        report = [f"{'action':<16}{'calls':>8}{'peak B/call':>14}{'blocks/call':>14}{'B/call':>10}"]
+        for allocations in sorted(self.actions.values(), key=lambda a: a.peak_per_call, reverse=True):
+            report.append(
+                f"{allocations.name:<16}{allocations.calls:>8}{allocations.peak_per_call:>14.0f}"
+                f"{allocations.blocks_per_call:>14.1f}{allocations.size_per_call:>10.0f}"
+            )
+            for (filename, lineno), (blocks, size) in allocations.top_lines(lines):
+                report.append(f"    {os.path.basename(filename)}:{lineno}: {blocks} blocks, {size} B")
+        return "\n".join(report)
+
+    # Raises OverBudget if, on average per call, the named action exceeds any of the budgets given: `peak` bytes
+    # of transient allocation, or `blocks` or `size` bytes retained.
+    def check(self, name, peak=None, blocks=None, size=None):
+        allocations = self.actions[name]
+        for budget, measured, description in (
+            (peak, allocations.peak_per_call, "peak bytes"),
+            (blocks, allocations.blocks_per_call, "blocks retained"),
+            (size, allocations.size_per_call, "bytes retained"),
+        ):
+            if budget is not None and measured > budget:
+                lines = "\n".join(
+                    f"    {os.path.basename(filename)}:{lineno}: {line_blocks} blocks, {line_size} B"
+                    for (filename, lineno), (line_blocks, line_size) in allocations.top_lines()
+                )
+                raise OverBudget(f"{name}: {measured:.1f} {description} per call, budget {budget}\n{lines}")
+
+
+class OverBudget(AssertionError):
+    pass
+
+
+class ActionAllocations:
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.peak = 0
+        self.blocks = 0
+        self.size = 0
+        # (filename, line number): [blocks, size] retained by the allocations made on each line
+        self.lines = {}
+
+    def add(self, peak, differences):
+        self.calls += 1
+        self.peak += peak
+        for difference in differences:
+            if not difference.count_diff and not difference.size_diff:
+                continue
+            frame = difference.traceback[0]
+            line = self.lines.setdefault((frame.filename, frame.lineno), [0, 0])
+            line[0] += difference.count_diff
+            line[1] += difference.size_diff
+            self.blocks += difference.count_diff
+            self.size += difference.size_diff
+
+    @property
+    def peak_per_call(self):
+        return self.peak / self.calls
+
+    @property
+    def blocks_per_call(self):
+        return self.blocks / self.calls
+
+    @property
+    def size_per_call(self):
+        return self.size / self.calls
+
+    def top_lines(self, count=3):
+        return sorted(self.lines.items(), key=lambda item: item[1][1], reverse=True)[:count]
+
+
+# Stands in for stdout, discarding what the camera prints at once. (A file would buffer the text, so that it
+# appeared to be retained by one action and freed by a later one.)
+class Discard:
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+# Profiles the allocations of shooting `rolls` rolls of film, attributed to constructing the camera, winding on,
+# pressing the shutter button (the shutter closing as soon as it has opened, as it does in program.run()) and
+# reporting the camera's state.
+def profile_camera(rolls=1, factory=Camera):
+    profile = AllocationProfile()
+    action = profile.action
+    with profile, contextlib.redirect_stdout(Discard()):
+        for _ in range(rolls):
+            with action("construct"):
+                camera = factory()
+            shutter = camera.exposure_control_system.shutter
+            shutter.timed = False
+            for _ in range(camera.film.frames):
+                with action("wind"):
+                    camera.film_advance_lever.wind()
+                with action("press"):
+                    camera.shutter_button.press()
+                    shutter.close()
+            with action("state"):
+                camera.state()
+    return profile
+
+
+# Profiles the body of the with statement as a single action, raising OverBudget if it exceeds any of the
+# budgets given (see AllocationProfile.check()). For example, in a test:
+#
+#     with allocation_budget(peak=2048, blocks=0):
+#         camera.shutter_button.press()
+@contextlib.contextmanager
+def allocation_budget(peak=None, blocks=None, size=None):
+    profile = AllocationProfile()
+    with profile:
+        with profile.action("budgeted"):
+            yield profile
+    profile.check("budgeted", peak=peak, blocks=blocks, size=size)
@@ -0,0 +1,53 @@
+# Measures the cost of feeding a metrics registry on the wind/press path.
+#
+# One camera, loaded with a long roll, is built before timing starts; each run winds, presses and closes the
+# shutter for every frame of the roll. Runs without and with metrics alternate, so that drift in the machine's speed
+# affects both alike, and the medians are reported.
+#
+# Run from the project root: python benchmarks/metrics_overhead.py
+
+import os, sys, time, statistics, contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from camera import Camera, Film
+
+
+FRAMES = 5000
+
+camera = Camera()
+camera.film = Film(frames=FRAMES, camera=camera)
+camera.exposure_control_system.shutter.timed = False
+
+
+# Returns the time per frame of shooting the whole roll. The methods are looked up afresh for each run, since
+# installing metrics replaces them, and a fresh battery is fitted, since a run's presses would soon flatten it.
+def shoot():
+    wind, press = camera.film_advance_lever.wind, camera.shutter_button.press
+    close = camera.exposure_control_system.shutter.close
+    camera.film.frame = 0
+    camera.exposure_control_system.battery.replace()
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        wind()
+        press()
+        close()
+    return (time.perf_counter() - start) / FRAMES
+
+
+if __name__ == "__main__":
+    runs = 21
+    plain, instrumented = [], []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        shoot()
+        for _ in range(runs):
+            plain.append(shoot())
+            metrics.install()
+            instrumented.append(shoot())
+            metrics.uninstall()
+
+    overhead = statistics.median(i / p - 1 for p, i in zip(plain, instrumented))
+    print(f"without metrics  {statistics.median(plain) * 1e6:8.2f} µs per frame (median of {runs} runs)")
+    print(f"with metrics     {statistics.median(instrumented) * 1e6:8.2f} µs per frame")
+    print(f"overhead         {overhead * 100:8.1f} % (median of paired runs)")
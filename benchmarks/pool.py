@@ -0,0 +1,28 @@
+# Compares getting a factory-fresh camera from a CameraPool against constructing a new Camera.
+#
+# Run from the project root: python benchmarks/pool.py
+
+import os, sys, timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camera import Camera
+from fleet import CameraPool
+
+
+def construct():
+    Camera()
+
+
+pool = CameraPool(size=1)
+
+def pooled():
+    camera = pool.acquire()
+    pool.release(camera)
+
+
+if __name__ == "__main__":
+    number = 20000
+    for name, function in (("Camera()", construct), ("CameraPool", pooled)):
+        best = min(timeit.repeat(function, number=number, repeat=5))
+        print(f"{name:<12} {best / number * 1e6:8.2f} µs per camera")
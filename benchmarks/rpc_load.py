@@ -0,0 +1,81 @@
+# Load-tests a camera control server: a number of concurrent clients each drive their own camera, sending batches
+# of commands, and the requests per second and latency percentiles are reported.
+#
+# Run from the project root. By default a server is started in this process; to test a separately running server
+# (python server.py), give its address:
+#
+#     python benchmarks/rpc_load.py --clients 16 --requests 2000 --batch 4
+#     python benchmarks/rpc_load.py --port 8765
+
+import os, sys, time, asyncio, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import CameraServer, CameraClient
+
+
+async def new_camera(c, batch):
+    [created] = await c.call([{"command": "create"}])
+    camera = created["result"]
+    if batch == 1:
+        return camera, [{"command": "state", "camera": camera}]
+    shoot = [{"command": "wind", "camera": camera}, {"command": "press", "camera": camera}]
+    return camera, (shoot * batch)[:batch]
+
+
+async def client(address, requests, batch, latencies):
+    c = await CameraClient.connect(**address)
+    camera, commands = await new_camera(c, batch)
+
+    for request in range(requests):
+        start = time.perf_counter()
+        results = await c.call(commands)
+        latencies.append(time.perf_counter() - start)
+
+        # at the end of the roll, start again with a fresh camera
+        if any("error" in result for result in results):
+            await c.call([{"command": "delete", "camera": camera}])
+            camera, commands = await new_camera(c, batch)
+
+    await c.close()
+
+
+def percentile(ordered, q):
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def main(arguments):
+    server = None
+    if arguments.port:
+        address = {"host": arguments.host, "port": arguments.port}
+    else:
+        server = await CameraServer().start()
+        address = {"host": "127.0.0.1", "port": server.sockets[0].getsockname()[1]}
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(address, arguments.requests, arguments.batch, latencies) for _ in range(arguments.clients)
+    ])
+    elapsed = time.perf_counter() - start
+
+    if server:
+        server.close()
+        await server.wait_closed()
+
+    latencies.sort()
+    print(f"{len(latencies)} requests of {arguments.batch} commands from {arguments.clients} clients")
+    print(f"{len(latencies) / elapsed:10.0f} requests per second")
+    print(f"{len(latencies) * arguments.batch / elapsed:10.0f} commands per second")
+    for q in (0.5, 0.9, 0.99):
+        print(f"p{int(q * 100):<3}      {percentile(latencies, q) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a camera control server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server; by default, one is started")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per client")
+    parser.add_argument("--batch", type=int, default=8, help="commands per request")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,151 @@
+import os, json, math, hashlib, tempfile, contextlib
+
+import camera
+from camera import Camera
+
+
+# ----------- Scenarios -----------
+
+# A Scenario is a roll shot in a given way: the film speed, and for each frame the shutter speed, aperture ("A" or
+# an ƒ-number) and scene luminosity. If `open_back_after` is set, the back is opened after that many frames.
+class Scenario:
+
+    def __init__(self, frames, film_speed=100, open_back_after=None):
+        self.frames = [tuple(frame) for frame in frames]
+        self.film_speed = film_speed
+        self.open_back_after = open_back_after
+
+    def key(self, version):
+        scenario = json.dumps([version, self.film_speed, self.open_back_after, self.frames])
+        return hashlib.sha256(scenario.encode()).hexdigest()
+
+    # Shoots the scenario with a new camera, returning for each frame whether it was exposed, whether the release
+    # was blocked, whether the film was ruined, and the EV of the exposure (None if there was none).
+    def run(self):
+        c = Camera()
+        shutter = c.exposure_control_system.shutter
+        shutter.timed = False
+        outcomes = []
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            c.film_speed = self.film_speed
+            for frame, (shutter_speed, aperture, luminosity) in enumerate(self.frames, start=1):
+                c.shutter_speed = shutter_speed
+                c.aperture = aperture
+                c.environment.scene_luminosity = luminosity
+                if not shutter.cocked:
+                    c.film_advance_lever.wind()
+                c.shutter_button.press()
+
+                exposed = not shutter.closed
+                ev = None
+                if exposed:
+                    ev = math.log2(c.exposure_control_system.iris.aperture ** 2 / shutter.timer)
+                    shutter.close()
+
+                if frame == self.open_back_after:
+                    c.back.open()
+
+                outcomes.append({"exposed": exposed, "blocked": not exposed, "ruined": c.film.ruined, "ev": ev})
+
+        return outcomes
+
+
+# ----------- Result cache -----------
+
+# The version of a module is the hash of its source. The version of the camera model is that of camera.py, so that
+# any change to it invalidates results that were cached (or traces that were recorded) before it.
+def source_version(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def model_version():
+    return source_version(camera.__file__)
+
+
+# A ScenarioCache keeps the outcomes of scenarios on disk, one file for each, named by the hash of the scenario and
+# of the version of the camera model and of this module (whose Scenario.run() turns a scenario into outcomes). When
+# the files take up more than `max_size` bytes, the least recently used are removed.
+#
+# Any number of processes can share a cache directory: each entry is written to a temporary file of its own and
+# then moved into place, so that a reader only ever sees a whole entry.
+class ScenarioCache:
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        self.version = f"{model_version()}:{source_version(__file__)}"
+        os.makedirs(directory, exist_ok=True)
+
+        # file name: size, for every entry in the cache
+        self.entries = {}
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".json"):
+                self.entries[entry.name] = entry.stat().st_size
+        self.size = sum(self.entries.values())
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, scenario):
+        name = scenario.key(self.version) + ".json"
+        if name not in self.entries:
+            return
+
+        try:
+            with open(self.path(name)) as f:
+                outcomes = json.load(f)
+        except (OSError, ValueError):
+            self.forget(name)
+            return
+
+        # the modification time records when the entry was last used
+        os.utime(self.path(name))
+        return outcomes
+
+    def put(self, scenario, outcomes):
+        name = scenario.key(self.version) + ".json"
+        data = json.dumps(outcomes).encode()
+
+        descriptor, temporary = tempfile.mkstemp(prefix=name, suffix=".tmp", dir=self.directory)
+        try:
+            with open(descriptor, "wb") as f:
+                f.write(data)
+            os.replace(temporary, self.path(name))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary)
+            raise
+
+        self.size += len(data) - self.entries.get(name, 0)
+        self.entries[name] = len(data)
+        self.evict()
+
+    # Returns the outcomes of the scenario, running it only if they are not already in the cache.
+    def run(self, scenario):
+        outcomes = self.get(scenario)
+        if outcomes is None:
+            outcomes = scenario.run()
+            self.put(scenario, outcomes)
+        return outcomes
+
+    def forget(self, name):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path(name))
+        self.size -= self.entries.pop(name, 0)
+
+    def evict(self):
+        if self.size <= self.max_size:
+            return
+
+        def last_used(name):
+            try:
+                return os.stat(self.path(name)).st_mtime_ns
+            except FileNotFoundError:
+                return 0
+
+        for name in sorted(self.entries, key=last_used):
+            if self.size <= self.max_size:
+                break
+            self.forget(name)
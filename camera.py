@@ -1,4 +1,9 @@
-import time, math
+import time, math, json
+from array import array
+
+# meter() treats a theoretical aperture this close (relatively) to the end of the aperture scale as being on it;
+# it's the default relative tolerance of math.isclose()
+METER_TOLERANCE = 1e-09
 
 class Camera:
 
@@ -7,11 +12,17 @@ class Camera:
     }
     selectable_film_speeds = (25, 50, 100, 200, 400, 800)
 
-    def __init__(self):
+    # A camera may be built to the specification of another model; by default, it's a Canonet G-III QL17.
+    def __init__(self, spec=None):
+        self.spec = spec or ql17
+        self.selectable_shutter_speeds = self.spec.shutter_speeds
+        self.selectable_film_speeds = self.spec.film_speeds
+
         # set up sub-systems
         self.back = Back(camera=self)
         self.exposure_control_system = ExposureControlSystem(
-            mode="Shutter priority", camera=self, film_speed=100, battery=1.44
+            mode="Shutter priority", camera=self, film_speed=self.spec.default_film_speed, battery=Battery(),
+            minimum_aperture=self.spec.minimum_aperture, maximum_aperture=self.spec.maximum_aperture,
         )
         self.film_advance_mechanism = FilmAdvanceMechanism(camera=self)
         self.film_rewind_mechanism = FilmRewindMechanism(camera=self)
@@ -21,14 +32,58 @@ class Camera:
 
         # set up camera settings and indicators
         self.frame_counter = 0
-        self.film_speed = 100
-        self.shutter_speed = 1/125
+        self.film_speed = self.spec.default_film_speed
+        self.shutter_speed = self.spec.default_shutter_speed
         self.aperture = "A"
         self.exposure_indicator = self.exposure_control_system.read_meter
 
         self.shutter_button = ShutterButton(camera=self)
         self.film_advance_lever = FilmAdvanceLever(camera=self)
 
+    # Restores the camera to the state it left the factory in, re-using its existing sub-systems, film and
+    # environment.
+    def reset(self):
+        self.back.closed = True
+        self.back.opened = None
+        self.lens_cap.on = False
+        self.film_advance_mechanism.advanced = False
+        self.environment.reset()
+
+        ecs = self.exposure_control_system
+        ecs.mode = "Shutter priority"
+        ecs.film_speed = self.spec.default_film_speed
+        # a fresh battery, in place of a spent Battery, or of a plain number or no battery at all
+        if isinstance(ecs.battery, Battery):
+            ecs.battery.replace()
+        else:
+            ecs.battery = Battery()
+        ecs.light_meter.battery = ecs.battery
+        ecs.light_meter.incident_light = 0
+        ecs.shutter.closed = True
+        ecs.shutter.cocked = False
+        ecs.shutter.timed = True
+        ecs.shutter_lock_lever.blocks = False
+        ecs.ee_lever.position = 0
+        ecs.aperture_set_lever._aperture = ecs.maximum_aperture
+        ecs.iris.aperture = ecs.maximum_aperture
+
+        if isinstance(self.film, Film):
+            self.film.speed = 100
+            self.film.frames = 24
+            self.film.frame = 0
+            self.film.camera = self
+            self.film.fully_rewound = False
+            self.film.ruined = False
+            self.film.exposures = array("d", [0]) * 24
+            self.film.fog = array("d", [0]) * 24
+        else:
+            self.film = Film(camera=self)
+
+        self.frame_counter = 0
+        self.film_speed = self.spec.default_film_speed
+        self.shutter_speed = self.spec.default_shutter_speed
+        self.aperture = "A"
+
 
     # ----------- Camera settings -----------
 
@@ -40,11 +95,11 @@ class Camera:
 
     @shutter_speed.setter
     def shutter_speed(self, value):
-        if not value in self.selectable_shutter_speeds:
-            possible_settings = ", ".join([f"1/{int(1/s)}" for s in self.selectable_shutter_speeds.keys()])
-            raise self.NonExistentShutterSpeed(f"Possible shutter speeds are {possible_settings}")
+        timer = self.selectable_shutter_speeds.get(value)
+        if timer is None:
+            raise self.NonExistentShutterSpeed(self.spec.shutter_speed_error)
 
-        self.exposure_control_system.shutter.timer = self.selectable_shutter_speeds[value]
+        self.exposure_control_system.shutter.timer = timer
         self._shutter_speed = value
 
     class NonExistentShutterSpeed(Exception):
@@ -62,8 +117,8 @@ class Camera:
         if value == "A":
             self.exposure_control_system.mode = "Shutter priority"
 
-        elif not 1.7 <= value <= 16:
-            raise self.ApertureOutOfRange
+        elif not self.spec.minimum_aperture <= value <= self.spec.maximum_aperture:
+            raise self.ApertureOutOfRange(self.spec.aperture_error)
 
         else:
             self.exposure_control_system.mode = "Manual"
@@ -85,8 +140,7 @@ class Camera:
     @film_speed.setter
     def film_speed(self, value):
         if not value in self.selectable_film_speeds:
-            possible_settings = ", ".join([f"{s}" for s in self.selectable_film_speeds])
-            raise self.NonExistentFilmSpeed(f"Possible film speeds are {possible_settings}")
+            raise self.NonExistentFilmSpeed(self.spec.film_speed_error)
 
         self.exposure_control_system.film_speed = value
         self._film_speed = value
@@ -95,8 +149,122 @@ class Camera:
         pass
 
 
+    # ----------- Bracketing -----------
+
+    # Shoots a bracket of `frames` exposures, `step` EV apart, centred on the metered exposure. The light is metered
+    # once, before the bracket; each frame is then shot in manual mode, varying either:
+    #
+    # * "aperture": the aperture, at the selected shutter speed
+    # * "shutter": the shutter speed, through the selectable speeds (so `step` must be a whole number of stops),
+    #   at the metered aperture
+    #
+    # A bracket that would need a setting the camera doesn't have - including the metered aperture itself, when
+    # the meter reads "Under" or "Over" - or more frames than are left on the film, or that the shutter lock would
+    # block, is rejected before anything is done. Afterwards the camera's aperture and shutter speed settings are restored. Returns the (shutter speed,
+    # aperture) of each frame.
+    def bracket(self, frames=3, step=1, vary="aperture"):
+        ecs = self.exposure_control_system
+        mode, aperture, shutter_speed = ecs.mode, self.aperture, self.shutter_speed
+
+        # meter in shutter-priority mode, whatever the camera is set to
+        ecs.mode = "Shutter priority"
+        measured_ev, metered_aperture = ecs.measured_ev(), ecs.meter()
+        ecs.mode = mode
+        if measured_ev is None:
+            raise self.BracketOutOfRange("The meter is not giving a reading")
+        # once a release has been blocked, the shutter lock stays engaged, and no frame of the bracket could be shot
+        if ecs.shutter_lock_lever.blocks:
+            raise self.BracketOutOfRange("The shutter lock is engaged")
+
+        # exposure offsets in EV, from least to most exposure
+        offsets = [(i - (frames - 1) / 2) * step for i in range(frames)]
+        settings = []
+
+        if vary == "aperture":
+            timer = self.selectable_shutter_speeds[shutter_speed]
+            for offset in offsets:
+                f_number = math.sqrt(math.pow(2, measured_ev - offset) * timer)
+                if not self.spec.minimum_aperture <= f_number <= self.spec.maximum_aperture:
+                    raise self.BracketOutOfRange(
+                        f"{offset:+g} EV needs ƒ/{f_number:.2g}; {self.spec.aperture_error}"
+                    )
+                settings.append((shutter_speed, f_number))
+
+        elif vary == "shutter":
+            if type(metered_aperture) is str or metered_aperture is None:
+                raise self.BracketOutOfRange(f"The meter reads {metered_aperture}")
+            # an even number of frames puts the offsets half a step either side of the metered exposure
+            if any(offset != int(offset) for offset in offsets):
+                raise self.BracketOutOfRange("Shutter speeds can only be bracketed in whole stops")
+            speeds = list(self.selectable_shutter_speeds)
+            position = speeds.index(shutter_speed)
+            for offset in offsets:
+                # one stop more exposure is the next slower speed
+                i = position - int(offset)
+                if not 0 <= i < len(speeds):
+                    raise self.BracketOutOfRange(f"{offset:+g} EV needs a shutter speed the camera doesn't have")
+                settings.append((speeds[i], metered_aperture))
+
+        else:
+            raise self.BracketOutOfRange(f"Can only vary the aperture or the shutter, not {vary}")
+
+        advanced = self.film_advance_mechanism.advanced
+        if self.film and self.film.frame + frames - advanced > self.film.frames:
+            raise Film.NoMoreFrames(f"A bracket of {frames} needs more frames than are left")
+
+        shutter = ecs.shutter
+        try:
+            for frame, (speed, f_number) in enumerate(settings, 1):
+                self.shutter_speed = speed
+                self.aperture = f_number
+                if not self.film_advance_mechanism.advanced:
+                    self.film_advance_lever.wind()
+                self.shutter_button.press()
+                if shutter.cocked and shutter.closed:
+                    raise self.BracketOutOfRange(f"The shutter release was blocked on frame {frame} of the bracket")
+        finally:
+            self.shutter_speed = shutter_speed
+            self.aperture = aperture
+
+        return settings
+
+    class BracketOutOfRange(Exception):
+        pass
+
+
+    # ----------- Exposure bounds -----------
+
+    # The range of scene luminosity, for the current film speed and shutter speed settings, in which the camera
+    # will allow an auto-exposure. Outside it, the meter reads "Under" or "Over" and the shutter is locked.
+    def exposure_bounds(self):
+        return self.spec.exposure_chart[(self.film_speed, self.shutter_speed)]
+
+
     # ----------- Reporting -----------
 
+    # The state of the camera's controls, indicators and mechanisms, as a dictionary.
+    def snapshot(self):
+        ecs = self.exposure_control_system
+        return {
+            "film_speed": self.film_speed,
+            "shutter_speed": self.shutter_speed,
+            "aperture": self.aperture,
+            "exposure_indicator": self.exposure_indicator(),
+            "frame_counter": self.frame_counter,
+            "back_closed": self.back.closed,
+            "lens_cap_on": self.lens_cap.on,
+            "advanced": self.film_advance_mechanism.advanced,
+            "cocked": ecs.shutter.cocked,
+            "shutter_closed": ecs.shutter.closed,
+            "shutter_locked": ecs.shutter_lock_lever.blocks,
+            "iris_aperture": ecs.iris.aperture,
+            "mode": ecs.mode,
+            "film_frame": self.film.frame,
+            "film_ruined": self.film.ruined,
+            "film_rewound": self.film.fully_rewound,
+            "scene_luminosity": self.environment.scene_luminosity,
+        }
+
     def state(self):
         print("================== Camera state =================")
         print()
@@ -209,80 +377,168 @@ class FilmRewindMechanism:
 
 class ExposureControlSystem:
 
-    def __init__(self, mode="Shutter priority", film_speed=100, camera=None, battery=None):
-        self.mode = mode
+    def __init__(
+        self, mode="Shutter priority", film_speed=100, camera=None, battery=None,
+        minimum_aperture=1.7, maximum_aperture=16
+    ):
+        self._mode = mode
         self.film_speed = film_speed
         self.camera = camera
         self.battery = battery
+        # the widest and narrowest apertures of the lens
+        self.minimum_aperture = minimum_aperture
+        self.maximum_aperture = maximum_aperture
+        self._inputs = None
 
         self.light_meter = LightMeter(exposure_control_system=self, battery=self.battery)
         self.shutter = Shutter(exposure_control_system=self)
-        self.iris = Iris(exposure_control_system=self)
+        self.iris = Iris(exposure_control_system=self, aperture=maximum_aperture)
 
         self.shutter_release_lever = ShutterReleaseLever(exposure_control_system=self)
         self.shutter_lock_lever = ShutterLockLever(exposure_control_system=self)
         self.ee_lever = EELever(exposure_control_system=self)
         self.exposure_level_lever = ExposureLevelLever(exposure_control_system=self)
         self.exposure_bounds_lever = ExposureBoundsLever(exposure_control_system=self)
-        self.aperture_set_lever = ApertureSetLever(exposure_control_system=self)
+        self.aperture_set_lever = ApertureSetLever(exposure_control_system=self, aperture=maximum_aperture)
 
-    # measured_ev is the exposure value from the system (that the aperture will need to
-    # respond to) and is determined by the light reading and the film-speed.
-    def measured_ev(self):
-        if self.light_meter.reading() is None:
-            return None
-        elif self.light_meter.reading() == 0:
-            return -math.inf
+        self.select_routines()
 
-        return math.log((self.light_meter.reading() * self.film_speed/12.5),2)
+    # Changing the mode (as the Camera's aperture setter does, on moving to or from "A") selects the release and
+    # cock routines specialised for that mode.
+    @property
+    def mode(self):
+        return self._mode
 
-    # the aperture that the system needs to set in order to match the measure_ev
-    def theoretical_aperture(self):
-        if self.measured_ev() is None:
-            return
+    @mode.setter
+    def mode(self, value):
+        if value != self._mode:
+            self._mode = value
+            self.select_routines()
 
-        return math.pow(2, self.measured_ev()/2) * math.sqrt(self.shutter.timer)
+    # Set to False to have the mechanism always take the generic path (from then on, whatever the mode).
+    _specialised = True
 
-    def meter(self):
-        if self.mode == "Manual" or self.theoretical_aperture() is None:
+    @property
+    def specialised(self):
+        return self._specialised
+
+    @specialised.setter
+    def specialised(self, value):
+        self._specialised = value
+        self.select_routines()
+
+    # The release and cock routines for the current mode, with the mode decided once, here, rather than each press
+    # asking the EE lever, the aperture set lever and the shutter what mode the system is in. Each does exactly what
+    # the generic path (ShutterReleaseLever.release() and Shutter.apply_aperture()) does in that mode; any other
+    # mode gets the generic path. They are selected as bound methods of the parts, so that a camera can still be
+    # copied or pickled.
+    def select_routines(self):
+        release_lever, shutter = self.shutter_release_lever, self.shutter
+        release_lever.__dict__.pop("release", None)
+        shutter.__dict__.pop("apply_aperture", None)
+        if not self._specialised:
             return
 
-        theoretical_aperture = self.theoretical_aperture()
+        if self.mode == "Manual":
+            release_lever.release = release_lever.manual_release
+            shutter.apply_aperture = shutter.manual_apply_aperture
+        elif self.mode == "Shutter priority":
+            release_lever.release = release_lever.shutter_priority_release
+            shutter.apply_aperture = shutter.shutter_priority_apply_aperture
+
+    # The values the system derives - the measured EV, the theoretical aperture, the meter reading and indicator,
+    # and the exposure value - depend only on the light meter's reading and the system's own settings. They are
+    # worked out again only when one of those has changed since the last time, so that polling the exposure
+    # indicator costs almost nothing.
+    def derived(self):
+        inputs = (
+            self.light_meter.reading(), self.film_speed, self.shutter.timer, self.mode, self.iris.aperture,
+            self.minimum_aperture, self.maximum_aperture,
+        )
+        if inputs != self._inputs:
+            self._inputs = inputs
+            self._derived = self.derive(*inputs)
+        return self._derived
+
+    def derive(self, reading, film_speed, timer, mode, iris_aperture, minimum, maximum):
+
+        # measured_ev is the exposure value from the system (that the aperture will need to
+        # respond to) and is determined by the light reading and the film-speed.
+        if reading is None:
+            measured_ev = None
+        elif reading == 0:
+            measured_ev = -math.inf
+        else:
+            measured_ev = math.log((reading * film_speed/12.5),2)
+
+        # the aperture that the system needs to set in order to match the measure_ev
+        if measured_ev is None:
+            theoretical_aperture = None
+        else:
+            theoretical_aperture = math.pow(2, measured_ev/2) * math.sqrt(timer)
+
+        if mode == "Manual" or theoretical_aperture is None:
+            meter = None
+        elif theoretical_aperture < minimum and math.isclose(theoretical_aperture, minimum, rel_tol=METER_TOLERANCE):
+            meter = minimum
+        elif theoretical_aperture > maximum and math.isclose(theoretical_aperture, maximum, rel_tol=METER_TOLERANCE):
+            meter = maximum
+        elif theoretical_aperture < minimum:
+            meter = "Under"
+        elif theoretical_aperture > maximum:
+            meter = "Over"
+        else:
+            meter = theoretical_aperture
 
-        if theoretical_aperture < 1.7 and math.isclose(theoretical_aperture, 1.7):
-            reading = 1.7
-        elif theoretical_aperture > 16 and math.isclose(theoretical_aperture, 16):
-           reading = 16
-        elif theoretical_aperture < 1.7:
-            reading = "Under"
-        elif theoretical_aperture > 16:
-            reading = "Over"
+        # what the meter needle actually shows (but only if the camera is actually metering)
+        if not meter:
+            indicator = None
+        elif type(meter) is not str:
+            indicator = f"ƒ/{meter:.2g}"
         else:
-            reading = theoretical_aperture
-        return reading
+            indicator = meter
 
-    # what the meter needle actually shows (but only if the camera is actually metering)
-    def read_meter(self):
-        if self.meter():
-            if type(self.meter()) is not str:
-                return f"ƒ/{self.meter():.2g}"
-            else:
-                return self.meter()
+        # the EV of the exposure system
+        if mode == "Manual":
+            exposure_value = math.log(math.pow(iris_aperture, 2)/timer, 2)
+        else:
+            exposure_value = "Shutter priority"
+
+        return measured_ev, theoretical_aperture, meter, indicator, exposure_value
 
+    def measured_ev(self):
+        return self.derived()[0]
+
+    def theoretical_aperture(self):
+        return self.derived()[1]
+
+    # The scene luminosities, for a given film speed and shutter timer, between which the meter can find an
+    # aperture. They include the band in which meter() snaps an aperture close to the widest or narrowest
+    # aperture onto the scale.
+    @staticmethod
+    def luminosity_bounds(film_speed, timer, minimum_aperture=1.7, maximum_aperture=16):
+        lower = math.pow(minimum_aperture * (1 - METER_TOLERANCE), 2) * 12.5 / (film_speed * timer)
+        upper = math.pow(maximum_aperture / (1 - METER_TOLERANCE), 2) * 12.5 / (film_speed * timer)
+        return lower, upper
+
+    def meter(self):
+        return self.derived()[2]
+
+    def read_meter(self):
+        return self.derived()[3]
 
     def exposure_value(self):
-        # returns the EV of the exposure system
-        if self.mode == "Manual":
-            return math.log(math.pow(self.iris.aperture, 2)/self.shutter.timer, 2)
-        else:
-            return "Shutter priority"
+        return self.derived()[4]
 
 class Shutter:
-    def __init__(self, exposure_control_system=None, timer=1/128, closed=True, cocked=False):
+    def __init__(self, exposure_control_system=None, timer=1/128, closed=True, cocked=False, timed=True):
         self.exposure_control_system = exposure_control_system
         self.timer = timer
         self.closed = closed
         self.cocked = cocked
+        # An untimed shutter is left open when it's tripped; something else (such as a Scheduler) is then
+        # responsible for closing it once the timer has run.
+        self.timed = timed
 
     def trip(self):
         # The shutter may only be tripped if it's already cocked - otherwise,
@@ -290,8 +546,29 @@ class Shutter:
         if not self.closed or not self.cocked:
             return
 
-        print(f"Shutter opening for 1/{int(1/self.timer)} seconds")
+        self.open()
+
+        if not self.timed:
+            return "Opened"
+
         time.sleep(self.timer)
+        return self.close()
+
+    def open(self):
+        print(f"Shutter opening for 1/{int(1/self.timer)} seconds")
+        self.closed = False
+
+        # the light let in through the iris exposes the frame of film behind the shutter
+        if self.exposure_control_system and self.exposure_control_system.camera:
+            camera = self.exposure_control_system.camera
+            if camera.film:
+                luminosity = 0 if camera.lens_cap.on else camera.environment.scene_luminosity
+                camera.film.expose(luminosity * self.timer / self.exposure_control_system.iris.aperture ** 2)
+
+    def close(self):
+        if self.closed:
+            return
+
         self.closed = True
         print("Shutter closes")
         self.cocked = False
@@ -309,16 +586,32 @@ class Shutter:
         print("Cocking shutter")
         self.cocked = True
 
-        # cocking the shutter causes the set_aperture_lever value to be applied to the iris
         if self.exposure_control_system:
-            if self.exposure_control_system.mode == "Shutter priority":
-                self.exposure_control_system.aperture_set_lever.aperture = 1.7
-            self.exposure_control_system.iris.aperture = self.exposure_control_system.aperture_set_lever.aperture
-            print(f"Applying aperture value ƒ/{self.exposure_control_system.aperture_set_lever.aperture:.2g} to iris")
+            self.apply_aperture()
 
         print("Cocked")
         return "Cocked"
 
+    # cocking the shutter causes the set_aperture_lever value to be applied to the iris (the generic path; see
+    # ExposureControlSystem.select_routines())
+    def apply_aperture(self):
+        if self.exposure_control_system.mode == "Shutter priority":
+            self.exposure_control_system.aperture_set_lever.aperture = self.exposure_control_system.minimum_aperture
+        self.exposure_control_system.iris.aperture = self.exposure_control_system.aperture_set_lever.aperture
+        print(f"Applying aperture value ƒ/{self.exposure_control_system.aperture_set_lever.aperture:.2g} to iris")
+
+    def manual_apply_aperture(self):
+        ecs = self.exposure_control_system
+        iris = ecs.iris
+        iris.aperture = ecs.aperture_set_lever._aperture
+        print(f"Applying aperture value ƒ/{iris.aperture:.2g} to iris")
+
+    def shutter_priority_apply_aperture(self):
+        ecs = self.exposure_control_system
+        minimum_aperture = ecs.minimum_aperture
+        ecs.aperture_set_lever._aperture = ecs.iris.aperture = minimum_aperture
+        print(f"Applying aperture value ƒ/{minimum_aperture:.2g} to iris")
+
     class AlreadyCocked(Exception):
         pass
 
@@ -334,6 +627,10 @@ class ShutterReleaseLever:
         if not self.exposure_control_system:
             return
 
+        return self.release()
+
+    # the generic release sequence; see ExposureControlSystem.select_routines()
+    def release(self):
         self.exposure_control_system.exposure_level_lever.activate()
         self.exposure_control_system.read_meter()
 
@@ -355,6 +652,36 @@ class ShutterReleaseLever:
 
         self.exposure_control_system.exposure_level_lever.deactivate()
 
+    # in manual mode the EE lever is locked, so the exposure bounds lever never blocks the release and the meter
+    # never moves the aperture set lever; only the battery is drawn on
+    def manual_release(self):
+        ecs = self.exposure_control_system
+        if isinstance(ecs.battery, Battery):
+            ecs.battery.activate()
+        if ecs.shutter_lock_lever.blocks:
+            print("Shutter release blocked")
+            return
+        ecs.shutter.trip()
+
+    def shutter_priority_release(self):
+        ecs = self.exposure_control_system
+        if isinstance(ecs.battery, Battery):
+            ecs.battery.activate()
+        lock = ecs.shutter_lock_lever
+        aperture = ecs.meter()
+        if aperture is None or aperture == "Under" or aperture == "Over":
+            lock.blocks = True
+        if lock.blocks:
+            print("Shutter release blocked")
+            return
+
+        iris, shutter = ecs.iris, ecs.shutter
+        ecs.aperture_set_lever._aperture = aperture
+        if shutter.cocked or aperture > iris.aperture:
+            iris.aperture = aperture
+        print(f"Applying aperture value ƒ/{aperture:.2g} to iris")
+        shutter.trip()
+
 
 class ExposureLevelLever:
     # no individual part number available
@@ -366,6 +693,10 @@ class ExposureLevelLever:
         if not self.exposure_control_system:
             return
 
+        # activating the lever switches on the meter, which draws on the battery
+        if isinstance(self.exposure_control_system.battery, Battery):
+            self.exposure_control_system.battery.activate()
+
         self.exposure_control_system.exposure_bounds_lever.activate()
 
         if not self.exposure_control_system.shutter_lock_lever.blocks:
@@ -501,25 +832,49 @@ class LightMeter:
         # measurement from the camera's environment - if the lens cap is not on.
         if not self.exposure_control_system:
             # If the rest of the camera is not around, we can still measure incident light on the meter.
-            return self.incident_light
+            light = self.incident_light
 
-        if self.exposure_control_system.camera.lens_cap.on:
+        elif self.exposure_control_system.camera.lens_cap.on:
             return 0
 
-        return self.exposure_control_system.camera.environment.scene_luminosity
+        else:
+            light = self.exposure_control_system.camera.environment.scene_luminosity
+
+        # a flagging battery makes the meter under-read
+        if isinstance(self.battery, Battery):
+            sag = self.battery.sag()
+            if sag < 1:
+                return light * sag
+
+        return light
 
 
 class Back:
     # The back is closed by default.
-    def __init__(self, camera, closed=True):
+    #
+    # Opening the back with exposed film in the camera, in the light, ruins the film. How badly depends on how long
+    # it is left open: the film is fogged (see Film.fog_light()) by `leak` times the scene luminosity at the
+    # moment it was opened, for every second until it is closed again. Time is read from `clock`, as a Battery's
+    # is; without a clock, no time passes, and the film is marked as ruined but takes no fog.
+    leak = 1/16
+
+    def __init__(self, camera, closed=True, clock=None):
         self.closed = closed
         self.camera = camera
+        self.clock = clock
+        # when the back was opened on exposed film, and the luminosity then
+        self.opened = None
 
     def close(self):
         if not self.closed:
             self.closed = True
             print("Closing back")
 
+            if self.opened:
+                opened_at, luminosity = self.opened
+                self.opened = None
+                self.camera.film.fog_light(luminosity * self.leak * (self.clock() - opened_at))
+
     def open(self):
         if not self.closed:
             return
@@ -532,13 +887,86 @@ class Back:
             return
 
         print("Resetting frame counter to 0")
-        if self.camera.environment.scene_luminosity > 0 and self.camera.film:
+        luminosity = self.camera.environment.scene_luminosity
+        if luminosity > 0 and self.camera.film:
             self.camera.film.ruined = True
+            if self.clock:
+                self.opened = (self.clock(), luminosity)
             return "Film is ruined"
 
 
 # ----------- Other objects -----------
 
+# A battery for the light meter. It can simply be a number - its voltage - or a Battery, which runs down:
+#
+# * each time the meter is switched on, by `activation_drain` mAh
+# * as time passes, by `idle_drain` mAh per second
+#
+# Time is read from `clock` (for example, a function returning a Scheduler's `now`); without a clock, no time
+# passes. The drain over time is worked out only when the battery's charge is needed, however long it has been.
+#
+# Its voltage holds at `nominal_voltage` until only the `knee` fraction of its charge is left, then falls towards
+# `end_voltage` as it empties, and the meter under-reads in proportion. Below `cutoff_voltage` the meter no longer
+# works.
+class Battery:
+
+    def __init__(
+        self, nominal_voltage=1.44, end_voltage=1.0, cutoff_voltage=1.2, knee=0.2, capacity=180,
+        activation_drain=0.001, idle_drain=0.000002, clock=None
+    ):
+        self.nominal_voltage = nominal_voltage
+        self.end_voltage = end_voltage
+        self.cutoff_voltage = cutoff_voltage
+        self.knee = knee
+        self.capacity = capacity
+        self.activation_drain = activation_drain
+        self.idle_drain = idle_drain
+        self.clock = clock
+        self.replace()
+
+    # puts in a fresh battery
+    def replace(self):
+        self._charge = self.capacity
+        self.updated = self.clock() if self.clock else 0
+
+    # the remaining charge, in mAh
+    def charge(self):
+        if self.clock:
+            now = self.clock()
+            if now > self.updated:
+                self._charge = max(self._charge - (now - self.updated) * self.idle_drain, 0)
+                self.updated = now
+        return self._charge
+
+    def activate(self):
+        self._charge = max(self.charge() - self.activation_drain, 0)
+
+    def voltage(self):
+        remaining = self.charge() / self.capacity
+        if remaining >= self.knee:
+            return self.nominal_voltage
+        return self.end_voltage + (self.nominal_voltage - self.end_voltage) * remaining / self.knee
+
+    # the proportion of the nominal voltage the battery is delivering
+    def sag(self):
+        return self.voltage() / self.nominal_voltage
+
+    # the time at which, if the meter is not used again, the battery will fall below the cutoff voltage
+    def time_of_cutoff(self):
+        remaining = self.charge() - self.capacity * self.knee * (
+            (self.cutoff_voltage - self.end_voltage) / (self.nominal_voltage - self.end_voltage)
+        )
+        if not self.idle_drain:
+            return math.inf if remaining > 0 else self.updated
+        return self.updated + max(remaining, 0) / self.idle_drain
+
+    def __bool__(self):
+        return self.voltage() >= self.cutoff_voltage
+
+    def __str__(self):
+        return f"{self.voltage():.3g}"
+
+
 class LensCap:
     def __init__(self, on=True):
         self.on = on
@@ -552,6 +980,28 @@ class Film:
         self.camera = camera
         self.fully_rewound = fully_rewound
         self.ruined = False
+        # the exposure each frame has received (scene luminosity x shutter time / ƒ-number squared)
+        self.exposures = array("d", [0]) * frames
+        # the exposure each frame has received from light leaking in through the open back
+        self.fog = array("d", [0]) * frames
+
+    def expose(self, exposure):
+        if self.frame == 0 or self.fully_rewound:
+            return
+
+        self.exposures[self.frame - 1] += exposure
+
+    # Light let in by opening the back: `exposure` is what a frame lying open to it receives. The frame in the gate
+    # and the stretch wound off the cassette beyond it (the next frame) lie open to it. The frames wound onto the
+    # take-up spool, emulsion inwards, are shielded by their own base and the turns wound over them, each turn
+    # letting through only `spool_transmission` of the light. Frames still in the cassette are safe.
+    spool_transmission = 0.05
+
+    def fog_light(self, exposure):
+        fog = self.fog
+        for frame, fraction in enumerate(light_leak(self.frame, self.frames, self.spool_transmission)):
+            if fraction:
+                fog[frame] += exposure * fraction
 
     def advance(self):
         if not self.frame < self.frames:
@@ -572,6 +1022,147 @@ class Film:
         pass
 
 
+# The fraction of the light let in by opening the back that reaches each frame of a roll of `frames` frames, with
+# `frame` in the gate (see Film.fog_light()). There are only as many patterns as there are frames, so each is
+# worked out once and shared.
+light_leaks = {}
+
+def light_leak(frame, frames, spool_transmission):
+    key = (frame, frames, spool_transmission)
+    if key not in light_leaks:
+        pattern = array("d", [0]) * frames
+        if frame:
+            pattern[frame - 1] = 1
+            if frame < frames:
+                pattern[frame] = 1
+            for turns, spooled in enumerate(range(frame - 2, -1, -1)):
+                pattern[spooled] = spool_transmission ** (turns + 1)
+        light_leaks[key] = pattern
+    return light_leaks[key]
+
+
 class Environment:
     def __init__(self, scene_luminosity=4096):
         self.scene_luminosity = scene_luminosity
+
+    def reset(self):
+        self.scene_luminosity = 4096
+
+    # raised by environments whose luminosity is not set directly (see traces.TraceEnvironment)
+    class LuminosityNotSettable(Exception):
+        pass
+
+
+# ----------- Camera specifications -----------
+
+# The settings available on a model of camera. When it's created, a specification compiles the tables that the
+# camera's settings use, so that nothing needs to be worked out each time a setting is changed:
+#
+# * shutter_speeds: maps each nominal shutter speed to the actual shutter timer
+# * shutter_speed_index: maps the denominator of each nominal shutter speed (125 for 1/125) to the shutter speed
+# * exposure_chart: the luminosity bounds of every combination of film speed and shutter speed, keyed by
+#   (film speed, shutter speed); a scene luminosity outside the bounds will lock the shutter in
+#   shutter-priority mode
+# * the messages of the exceptions raised for settings the camera doesn't have
+class CameraSpec:
+
+    def __init__(
+        self, name, shutter_speeds, film_speeds, minimum_aperture, maximum_aperture,
+        default_shutter_speed=1/125, default_film_speed=100
+    ):
+        self.name = name
+        self.shutter_speeds = dict(shutter_speeds)
+        self.film_speeds = tuple(film_speeds)
+        self.minimum_aperture = minimum_aperture
+        self.maximum_aperture = maximum_aperture
+        self.default_shutter_speed = default_shutter_speed
+        self.default_film_speed = default_film_speed
+
+        # speeds are marked, indexed and programmed by their denominators, so each must be 1/N of a second, for
+        # some whole N greater than 1
+        for s in self.shutter_speeds:
+            if not 0 < s < 1 or not math.isclose(1/s, round(1/s)):
+                raise self.UnsupportedShutterSpeed(f"{s} s is not a fraction 1/N of a second")
+        self.shutter_speed_index = {round(1/s): s for s in self.shutter_speeds}
+
+        possible_settings = ", ".join([f"1/{round(1/s)}" for s in self.shutter_speeds])
+        self.shutter_speed_error = f"Possible shutter speeds are {possible_settings}"
+        possible_settings = ", ".join([f"{s}" for s in self.film_speeds])
+        self.film_speed_error = f"Possible film speeds are {possible_settings}"
+
+        # a camera built to the specification starts at its defaults, so they must be settings it has
+        if default_shutter_speed not in self.shutter_speeds:
+            raise self.InvalidDefault(f"default_shutter_speed {default_shutter_speed}: {self.shutter_speed_error}")
+        if default_film_speed not in self.film_speeds:
+            raise self.InvalidDefault(f"default_film_speed {default_film_speed}: {self.film_speed_error}")
+        self.aperture_error = f"Possible apertures are ƒ/{minimum_aperture:.2g} to ƒ/{maximum_aperture:.2g}"
+
+        self.exposure_chart = {
+            (film_speed, shutter_speed): ExposureControlSystem.luminosity_bounds(
+                film_speed, timer, minimum_aperture, maximum_aperture
+            )
+            for film_speed in self.film_speeds
+            for shutter_speed, timer in self.shutter_speeds.items()
+        }
+
+    class UnsupportedShutterSpeed(Exception):
+        pass
+
+    class InvalidDefault(Exception):
+        pass
+
+    # Loads a specification from a JSON file, in which shutter speeds are written as they are marked on the
+    # shutter ring, mapped to the actual timer, for example:
+    #
+    #     {
+    #         "name": "Canonet G-III QL17",
+    #         "shutter_speeds": {"1/4": "1/4", "1/8": "1/8", "1/15": "1/16", ...},
+    #         "film_speeds": [25, 50, 100, 200, 400, 800],
+    #         "apertures": [1.7, 16],
+    #         "default_shutter_speed": "1/125",
+    #         "default_film_speed": 100
+    #     }
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+
+        def seconds(value):
+            if isinstance(value, str) and "/" in value:
+                numerator, denominator = value.split("/")
+                return int(numerator) / int(denominator)
+            return float(value)
+
+        minimum_aperture, maximum_aperture = spec["apertures"]
+        return cls(
+            name=spec["name"],
+            shutter_speeds={seconds(nominal): seconds(actual) for nominal, actual in spec["shutter_speeds"].items()},
+            film_speeds=spec["film_speeds"],
+            minimum_aperture=minimum_aperture,
+            maximum_aperture=maximum_aperture,
+            default_shutter_speed=seconds(spec.get("default_shutter_speed", "1/125")),
+            default_film_speed=spec.get("default_film_speed", 100),
+        )
+
+
+ql17 = CameraSpec(
+    "Canonet G-III QL17", Camera.selectable_shutter_speeds, Camera.selectable_film_speeds,
+    minimum_aperture=1.7, maximum_aperture=16,
+)
+
+# the exposure chart of the Canonet G-III QL17
+exposure_chart = ql17.exposure_chart
+
+
+# The exceptions a camera raises when it refuses an action, because it would violate the logic of the mechanism or
+# there is no such setting.
+REFUSALS = (
+    Camera.NonExistentShutterSpeed,
+    Camera.BracketOutOfRange,
+    Camera.ApertureOutOfRange,
+    Camera.NonExistentFilmSpeed,
+    FilmAdvanceMechanism.AlreadyAdvanced,
+    Shutter.AlreadyCocked,
+    Film.NoMoreFrames,
+    Environment.LuminosityNotSettable,
+)
@@ -0,0 +1,117 @@
+import math
+from array import array
+from bisect import bisect_right
+
+from camera import Back, Film, light_leak
+
+
+# The film receives only part of the light from the scene; this converts a frame's exposure (scene luminosity x
+# shutter time / ƒ-number squared, as recorded by the film) into the luminous exposure at the film plane, in
+# lux-seconds.
+FILM_PLANE_FACTOR = 0.65
+
+
+# ----------- Characteristic curves -----------
+
+# The shape of a typical black-and-white negative film's characteristic (H&D) curve, as density above base-plus-fog
+# against log10 of the exposure relative to the film's speed point (the exposure, 0.8/ISO lux-seconds, at which the
+# density reaches 0.1 above base-plus-fog). Below the first point is the toe, where the film does not respond;
+# above the last is the shoulder, where it can get no denser.
+TYPICAL_CURVE = (
+    (-1.0, 0), (-0.5, 0.02), (0, 0.1), (0.3, 0.22), (0.6, 0.4), (1.0, 0.66),
+    (1.5, 0.99), (2.0, 1.31), (2.5, 1.6), (3.0, 1.8), (3.5, 1.9),
+)
+
+
+class CharacteristicCurve:
+
+    def __init__(self, points, base_fog=0.2):
+        self.log_exposures = array("d", [log_exposure for log_exposure, _ in points])
+        self.densities = array("d", [base_fog + density for _, density in points])
+        self.base_fog = base_fog
+        self.maximum_density = self.densities[-1]
+
+    # the curve of a film of the given ISO speed, with the typical shape
+    @classmethod
+    def for_speed(cls, speed, base_fog=0.2):
+        speed_point = math.log10(0.8 / speed)
+        return cls([(speed_point + offset, density) for offset, density in TYPICAL_CURVE], base_fog)
+
+    def density(self, exposure):
+        return self.densities_of([exposure])[0]
+
+    # Maps a sequence of frame exposures to negative densities, by linear interpolation along the curve.
+    def densities_of(self, exposures):
+        log_exposures, densities = self.log_exposures, self.densities
+        first, last = log_exposures[0], log_exposures[-1]
+        base_fog, maximum_density = densities[0], densities[-1]
+        log10 = math.log10
+
+        result = array("f", bytes(4 * len(exposures)))
+        for frame, exposure in enumerate(exposures):
+            if exposure <= 0:
+                result[frame] = base_fog
+                continue
+
+            log_exposure = log10(exposure * FILM_PLANE_FACTOR)
+            if log_exposure <= first:
+                result[frame] = base_fog
+            elif log_exposure >= last:
+                result[frame] = maximum_density
+            else:
+                i = bisect_right(log_exposures, log_exposure)
+                x0, x1 = log_exposures[i - 1], log_exposures[i]
+                y0, y1 = densities[i - 1], densities[i]
+                result[frame] = y0 + (y1 - y0) * (log_exposure - x0) / (x1 - x0)
+
+        return result
+
+
+# ----------- Development -----------
+
+# Curves are built once for each film speed and shared.
+curves = {}
+
+def curve_for(speed):
+    if speed not in curves:
+        curves[speed] = CharacteristicCurve.for_speed(speed)
+    return curves[speed]
+
+
+# Develops a roll of film, returning the density of each of its frames as a compact array. Light leaked in through
+# the back adds to the frames' exposures; a film that was ruined without any record of how much light leaked in
+# (because its camera's back had no clock) is taken to have been fogged throughout, and comes out at maximum
+# density.
+def develop(film):
+    curve = curve_for(film.speed)
+    if any(film.fog):
+        return curve.densities_of(array("d", map(float.__add__, film.exposures, film.fog)))
+    if film.ruined:
+        return array("f", [curve.maximum_density]) * film.frames
+    return curve.densities_of(film.exposures)
+
+
+# Develops many rolls - say, the films of a fleet of cameras - returning a density array for each.
+def develop_all(films):
+    return [develop(film) for film in films]
+
+
+# ----------- Light leaks -----------
+
+# The fog density (above base-plus-fog) that opening the back puts on each frame of a roll, for many openings at
+# once - say, every time a back was opened in a fleet's incident log. Each event is (frame, luminosity, seconds):
+# the frame in the gate when the back was opened, the scene luminosity, and how long the back stayed open on the
+# simulated clock. Returns a flat array with a row of `frames` densities for each event.
+#
+# The exposures of all the events are laid out in one array and taken through the curve together; each row is just
+# the leak pattern for its frame (worked out once per frame, and shared) scaled by the event's exposure.
+def fog_densities(events, speed=100, frames=24, leak=Back.leak, spool_transmission=Film.spool_transmission):
+    curve = curve_for(speed)
+    exposures = array("d")
+    for frame, luminosity, seconds in events:
+        exposure = float(luminosity * leak * seconds)
+        exposures.extend(map(exposure.__mul__, light_leak(frame, frames, spool_transmission)))
+
+    # base-plus-fog as the (single-precision) densities have it, so that unfogged frames come out at exactly 0
+    base_fog = curve.density(0)
+    return array("f", [density - base_fog for density in curve.densities_of(exposures)])
@@ -0,0 +1,192 @@
+import os, ast, csv, sys, math
+from array import array
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# ----------- Columns -----------
+
+# The columns of a simulation's results, one row per frame, with the typecode each is kept in. EV and meter
+# reading are NaN where there is none (a blocked release, or a meter with no battery).
+COLUMNS = (
+    ("camera", "q"),            # camera id
+    ("frame", "l"),             # frame number on the film
+    ("shutter_timer", "d"),     # seconds
+    ("aperture", "d"),          # iris aperture, ƒ-number
+    ("ev", "d"),                # EV of the exposure
+    ("meter", "d"),             # light meter reading, cd/m^2
+    ("blocked", "b"),           # 1 if the shutter release was blocked
+    ("ruined", "b"),            # 1 if the film has been ruined
+)
+
+# .npy descriptions of the typecodes, in little-endian byte order
+NPY_TYPES = {"q": "<i8", "l": "<i8", "d": "<f8", "b": "|i1"}
+
+FORMATS = ("csv", "npy", "parquet")
+
+
+def new_buffers():
+    return {name: array("q" if typecode == "l" else typecode) for name, typecode in COLUMNS}
+
+
+# ----------- Writer -----------
+
+# A ResultWriter streams rows of results to disk, holding no more than `chunk_rows` of them in memory. Rows are
+# buffered column by column, and written out as a chunk whenever the buffers are full:
+#
+# * csv: rows appended to a single CSV file
+# * npy: a directory of chunks, each a directory holding one .npy file per column
+# * parquet: a single Parquet file, with a row group per chunk (needs pyarrow)
+class ResultWriter:
+
+    def __init__(self, path, format="csv", chunk_rows=65536):
+        if format not in FORMATS:
+            raise self.UnknownFormat(f"Formats are {', '.join(FORMATS)}")
+        if format == "parquet" and not pyarrow:
+            raise self.UnknownFormat("Writing Parquet needs pyarrow to be installed")
+
+        self.path = path
+        self.format = format
+        self.chunk_rows = chunk_rows
+        self.buffers = new_buffers()
+        self.rows = 0
+        self.chunks = 0
+
+        if format == "csv":
+            self.file = open(path, "w", newline="")
+            self.csv = csv.writer(self.file)
+            self.csv.writerow([name for name, _ in COLUMNS])
+        elif format == "npy":
+            os.makedirs(path, exist_ok=True)
+        else:
+            types = {"q": pyarrow.int64(), "l": pyarrow.int64(), "d": pyarrow.float64(), "b": pyarrow.int8()}
+            schema = pyarrow.schema([(name, types[typecode]) for name, typecode in COLUMNS])
+            self.parquet = pyarrow.parquet.ParquetWriter(path, schema)
+
+    class UnknownFormat(Exception):
+        pass
+
+    def write(self, camera, frame, shutter_timer, aperture, ev, meter, blocked, ruined):
+        buffers = self.buffers
+        buffers["camera"].append(camera)
+        buffers["frame"].append(frame)
+        buffers["shutter_timer"].append(shutter_timer)
+        buffers["aperture"].append(aperture)
+        buffers["ev"].append(math.nan if ev is None else ev)
+        buffers["meter"].append(math.nan if meter is None else meter)
+        buffers["blocked"].append(blocked)
+        buffers["ruined"].append(ruined)
+        self.rows += 1
+        if len(buffers["camera"]) >= self.chunk_rows:
+            self.flush()
+
+    # Writes a row for the frame a camera has just exposed, or tried to expose.
+    def write_camera(self, id, camera, blocked):
+        ecs = camera.exposure_control_system
+        timer, aperture = ecs.shutter.timer, ecs.iris.aperture
+        ev = None if blocked else math.log2(aperture ** 2 / timer)
+        self.write(id, camera.film.frame, timer, aperture, ev, ecs.light_meter.reading(), blocked, camera.film.ruined)
+
+    def flush(self):
+        buffers = self.buffers
+        if not buffers["camera"]:
+            return
+
+        if self.format == "csv":
+            self.csv.writerows(zip(*[buffers[name] for name, _ in COLUMNS]))
+        elif self.format == "npy":
+            directory = os.path.join(self.path, f"chunk-{self.chunks:06d}")
+            os.makedirs(directory, exist_ok=True)
+            for name, typecode in COLUMNS:
+                write_npy(os.path.join(directory, name + ".npy"), buffers[name], NPY_TYPES[typecode])
+        else:
+            self.parquet.write_table(
+                pyarrow.table({name: list(buffers[name]) for name, _ in COLUMNS}, schema=self.parquet.schema)
+            )
+
+        self.chunks += 1
+        self.buffers = new_buffers()
+
+    def close(self):
+        self.flush()
+        if self.format == "csv":
+            self.file.close()
+        elif self.format == "parquet":
+            self.parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+# ----------- Reader -----------
+
+# Reads results written by a ResultWriter, one chunk at a time, yielding a dictionary of column name: array for
+# each. CSV files are read in chunks of `chunk_rows`.
+def read_chunks(path, format="csv", chunk_rows=65536):
+    if format == "csv":
+        with open(path, newline="") as f:
+            rows = csv.reader(f)
+            names = next(rows)
+            types = dict(COLUMNS)
+            buffers = new_buffers()
+            for row in rows:
+                for name, value in zip(names, row):
+                    buffers[name].append(float(value) if types[name] == "d" else int(value))
+                if len(buffers["camera"]) >= chunk_rows:
+                    yield buffers
+                    buffers = new_buffers()
+            if buffers["camera"]:
+                yield buffers
+
+    elif format == "npy":
+        for chunk in sorted(os.listdir(path)):
+            directory = os.path.join(path, chunk)
+            yield {name: read_npy(os.path.join(directory, name + ".npy")) for name, _ in COLUMNS}
+
+    elif format == "parquet":
+        if not pyarrow:
+            raise ResultWriter.UnknownFormat("Reading Parquet needs pyarrow to be installed")
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield {
+                name: array("q" if typecode == "l" else typecode, batch.column(name).to_pylist())
+                for name, typecode in COLUMNS
+            }
+
+    else:
+        raise ResultWriter.UnknownFormat(f"Formats are {', '.join(FORMATS)}")
+
+
+# ----------- .npy files -----------
+
+# Arrays are written in the NumPy .npy format (version 1.0), so they can be loaded with numpy.load() - or
+# memory-mapped with numpy.load(mmap_mode="r") - without numpy being needed to write them.
+def write_npy(path, values, descr):
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({len(values)},), }}"
+    # the header is padded so that the data starts on a 64-byte boundary
+    header += " " * (63 - (10 + len(header)) % 64) + "\n"
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, "wb") as f:
+        f.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1"))
+        values.tofile(f)
+
+
+def read_npy(path):
+    typecodes = {"<i8": "q", "<f8": "d", "|i1": "b"}
+    with open(path, "rb") as f:
+        if f.read(8) != b"\x93NUMPY\x01\x00":
+            raise ValueError(f"{path} is not a version 1.0 .npy file")
+        header = ast.literal_eval(f.read(int.from_bytes(f.read(2), "little")).decode("latin1"))
+        values = array(typecodes[header["descr"]])
+        values.fromfile(f, header["shape"][0])
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values.byteswap()
+    return values
@@ -0,0 +1,174 @@
+import contextlib
+
+from camera import Camera, Battery
+
+
+# ----------- Camera pool -----------
+
+# A CameraPool hands out cameras in their factory state, re-using cameras that have been returned to it rather than
+# building new ones. At most `size` returned cameras are kept; any more are simply dropped.
+class CameraPool:
+
+    def __init__(self, size=64):
+        self.size = size
+        self.cameras = []
+
+    def acquire(self):
+        if self.cameras:
+            return self.cameras.pop()
+        return Camera()
+
+    def release(self, camera):
+        if len(self.cameras) >= self.size:
+            return
+
+        camera.reset()
+        self.cameras.append(camera)
+
+    @contextlib.contextmanager
+    def camera(self):
+        camera = self.acquire()
+        try:
+            yield camera
+        finally:
+            self.release(camera)
+
+
+# ----------- Sparse fleet -----------
+
+# A SparseFleet holds `size` cameras, numbered from 0, most of which are expected to sit at their factory settings
+# doing nothing. Such a camera costs nothing at all. A camera whose settings (shutter speed, aperture, film speed
+# and scene luminosity) have been changed, but which has not otherwise been touched, is kept only as its settings
+# that differ from the factory's - and cameras with the same differences share them.
+#
+# A camera becomes a real Camera, taken from a CameraPool and given its settings, as soon as anything is done with
+# it (see act()). Once it is again no different from a camera fresh from the factory with the same settings, it is
+# returned to the pool, and only its settings are kept.
+class SparseFleet:
+
+    settings = ("shutter_speed", "aperture", "film_speed", "scene_luminosity")
+
+    def __init__(self, size, pool=None):
+        self.size = size
+        self.pool = pool or CameraPool()
+        # camera number: its settings that differ from the factory's, as a tuple of (setting, value) pairs
+        self.deltas = {}
+        # camera number: Camera, for the cameras that are real
+        self.cameras = {}
+        # each distinct tuple of deltas, so that cameras with the same differences share one
+        self.variants = {}
+        # the state of a camera fresh from the factory, for each tuple of deltas (see state_of())
+        self.fresh = {}
+
+        self.scratch = Camera()
+        self.spec = self.scratch.spec
+        self.defaults = {setting: read(self.scratch, setting) for setting in self.settings}
+
+    def __len__(self):
+        return self.size
+
+    def check(self, number):
+        if not 0 <= number < self.size:
+            raise IndexError(f"There are {self.size} cameras in the fleet")
+
+    def get(self, number, setting):
+        self.check(number)
+        if number in self.cameras:
+            return read(self.cameras[number], setting)
+        return dict(self.deltas.get(number, ())).get(setting, self.defaults[setting])
+
+    # Changes a camera's setting, refusing illegal values just as the camera itself would. Changing a setting is
+    # not enough to make a camera real.
+    def set(self, number, setting, value):
+        self.check(number)
+        if number in self.cameras:
+            write(self.cameras[number], setting, value)
+            self.settle(number)
+            return
+
+        self.validate(setting, value)
+        deltas = dict(self.deltas.get(number, ()))
+        if value == self.defaults[setting]:
+            deltas.pop(setting, None)
+        else:
+            deltas[setting] = value
+        self.keep(number, deltas)
+
+    def validate(self, setting, value):
+        spec = self.spec
+        if setting == "shutter_speed" and value not in spec.shutter_speeds:
+            raise Camera.NonExistentShutterSpeed(spec.shutter_speed_error)
+        elif setting == "aperture" and value != "A" and not spec.minimum_aperture <= value <= spec.maximum_aperture:
+            raise Camera.ApertureOutOfRange(spec.aperture_error)
+        elif setting == "film_speed" and value not in spec.film_speeds:
+            raise Camera.NonExistentFilmSpeed(spec.film_speed_error)
+        elif setting not in self.settings:
+            raise KeyError(setting)
+
+    def keep(self, number, deltas):
+        if not deltas:
+            self.deltas.pop(number, None)
+            return
+        deltas = tuple(sorted(deltas.items()))
+        self.deltas[number] = self.variants.setdefault(deltas, deltas)
+
+    # Returns the camera as a real Camera, making it one if it isn't already. Anything can be done with it; call
+    # settle() afterwards to let the fleet return it to the pool if it's no different from a fresh one.
+    def camera(self, number):
+        self.check(number)
+        if number not in self.cameras:
+            camera = self.pool.acquire()
+            for setting, value in self.deltas.pop(number, ()):
+                write(camera, setting, value)
+            self.cameras[number] = camera
+        return self.cameras[number]
+
+    # Does `action(camera, *arguments)` with the camera, and returns what it returns.
+    def act(self, number, action, *arguments):
+        try:
+            return action(self.camera(number), *arguments)
+        finally:
+            self.settle(number)
+
+    def settle(self, number):
+        camera = self.cameras.get(number)
+        if camera is None:
+            return
+
+        values = {setting: read(camera, setting) for setting in self.settings}
+        deltas = {setting: value for setting, value in values.items() if value != self.defaults[setting]}
+        key = tuple(sorted(deltas.items()))
+        if key not in self.fresh:
+            self.scratch.reset()
+            for setting, value in key:
+                write(self.scratch, setting, value)
+            self.fresh[key] = state_of(self.scratch)
+
+        if state_of(camera) == self.fresh[key]:
+            del self.cameras[number]
+            self.pool.release(camera)
+            self.keep(number, deltas)
+
+
+def read(camera, setting):
+    if setting == "scene_luminosity":
+        return camera.environment.scene_luminosity
+    return getattr(camera, setting)
+
+
+def write(camera, setting, value):
+    if setting == "scene_luminosity":
+        camera.environment.scene_luminosity = value
+    else:
+        setattr(camera, setting, value)
+
+
+# Everything about a camera that can change, as a tuple that can be compared with another camera's.
+def state_of(camera):
+    ecs = camera.exposure_control_system
+    film = camera.film
+    battery = ecs.battery.charge() if isinstance(ecs.battery, Battery) else ecs.battery
+    return tuple(camera.snapshot().values()) + (
+        ecs.aperture_set_lever.aperture, battery, ecs.light_meter.incident_light, ecs.shutter.timed,
+        camera.back.opened, film.speed, film.frames, any(film.exposures), any(film.fog),
+    )
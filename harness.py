@@ -0,0 +1,321 @@
+import os, math, json, random, hashlib, argparse, importlib, contextlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from camera import Camera, REFUSALS, ql17
+from cache import model_version
+from program import (
+    Program, opcodes, SET_SHUTTER, SET_APERTURE, SET_FILM_SPEED, SET_LUMINOSITY, WIND, PRESS, CAP_ON, CAP_OFF,
+    OPEN_BACK, CLOSE_BACK, REWIND,
+)
+
+
+# ----------- Traces -----------
+
+# A trace records, after each instruction of a program, the outcome of the instruction and the state of the camera,
+# as a row of numbers in a flat array('d'). Any engine that can run programs - the object model in camera.py, or a
+# faster batch, table-driven or asynchronous one - can produce a trace, and two engines agree on a program if their
+# traces are identical.
+
+# what an instruction did: finished, exposed a frame, was blocked by the shutter lock, or was refused by the
+# mechanism with one of the REFUSALS exceptions
+OUTCOMES = ("done", "exposed", "blocked") + tuple(exception.__name__ for exception in REFUSALS)
+
+# the columns of a row: the outcome, the camera's snapshot(), and the exposure the film has received on its
+# current frame
+FIELDS = ("outcome",) + tuple(Camera().snapshot()) + ("exposure",)
+
+# how the strings in a snapshot are recorded; a meter needle's "ƒ/..." is recorded as its number
+CODES = {"A": 0, "Shutter priority": 0, "Manual": 1, "Under": -math.inf, "Over": math.inf}
+
+
+def encode(value):
+    if value is None:
+        return math.nan
+    elif type(value) is str:
+        return CODES[value] if value in CODES else float(value[2:])
+    return value
+
+
+# Runs a program on a camera-like object one instruction at a time, as program.run() would, returning its trace.
+# Exceptions in REFUSALS are recorded in the trace rather than stopping the program.
+def trace(camera, program):
+    rows = array("d")
+    shutter = camera.exposure_control_system.shutter
+    lock = camera.exposure_control_system.shutter_lock_lever
+    shutter_speeds = camera.spec.shutter_speed_index
+    refusals = {exception: OUTCOMES.index(exception.__name__) for exception in REFUSALS}
+    shutter.timed = False
+
+    code = program.code
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(0, len(code), 2):
+            opcode, operand = code[i], code[i + 1]
+            outcome = 0
+            try:
+                if opcode == WIND:
+                    camera.film_advance_lever.wind()
+                elif opcode == PRESS:
+                    camera.shutter_button.press()
+                    outcome = 1 if shutter.close() else 2 if lock.blocks else 0
+                elif opcode == SET_SHUTTER:
+                    camera.shutter_speed = shutter_speeds[operand]
+                elif opcode == SET_APERTURE:
+                    camera.aperture = operand if operand else "A"
+                elif opcode == SET_FILM_SPEED:
+                    camera.film_speed = int(operand)
+                elif opcode == SET_LUMINOSITY:
+                    camera.environment.scene_luminosity = operand
+                elif opcode == CAP_ON:
+                    camera.lens_cap.on = True
+                elif opcode == CAP_OFF:
+                    camera.lens_cap.on = False
+                elif opcode == OPEN_BACK:
+                    camera.back.open()
+                elif opcode == CLOSE_BACK:
+                    camera.back.close()
+                elif opcode == REWIND:
+                    camera.film_rewind_mechanism.rewind()
+            except REFUSALS as exception:
+                outcome = refusals[type(exception)]
+
+            film = camera.film
+            rows.append(outcome)
+            rows.extend(map(encode, camera.snapshot().values()))
+            rows.append(film.exposures[film.frame - 1] if film.frame else 0)
+
+    return rows
+
+
+# An engine runs a program for a camera specification and returns its trace. An ObjectEngine does so with
+# camera-like objects made by `factory(spec=spec)`; give it a class, rather than a lambda, so that it can be sent to
+# worker processes.
+class ObjectEngine:
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __call__(self, program, spec):
+        return trace(self.factory(spec=spec), program)
+
+
+reference = ObjectEngine(Camera)
+
+
+def digest(rows):
+    return hashlib.blake2b(rows.tobytes(), digest_size=16).digest()
+
+
+# ----------- Programs -----------
+
+# Generates the `index`th random program of a series. Every setting in it is one the camera's specification
+# allows, so that any refusal comes from the mechanism's interlocks; the same seed, index, length and
+# specification always give the same program.
+def generate(seed, index, length=64, spec=ql17):
+    generator = random.Random(f"{seed}:{index}")
+    shutter_speeds = list(spec.shutter_speed_index)
+    apertures = [0, spec.minimum_aperture, 2.8, 4, 5.6, 8, 11, spec.maximum_aperture]
+    apertures = [a for a in apertures if not a or spec.minimum_aperture <= a <= spec.maximum_aperture]
+    luminosities = [0] + [2 ** n for n in range(17)]
+    choices = (
+        [WIND] * 6 + [PRESS] * 6 + [SET_SHUTTER] * 2 + [SET_APERTURE] * 2 + [SET_LUMINOSITY] * 2
+        + [SET_FILM_SPEED, CAP_ON, CAP_OFF, OPEN_BACK, CLOSE_BACK, REWIND]
+    )
+
+    code = []
+    for _ in range(length):
+        opcode = generator.choice(choices)
+        if opcode == SET_SHUTTER:
+            operand = generator.choice(shutter_speeds)
+        elif opcode == SET_APERTURE:
+            operand = generator.choice(apertures)
+        elif opcode == SET_FILM_SPEED:
+            operand = generator.choice(spec.film_speeds)
+        elif opcode == SET_LUMINOSITY:
+            operand = generator.choice(luminosities)
+        else:
+            operand = 0
+        code += [opcode, operand]
+    return Program(code)
+
+
+def disassemble(program, step):
+    names = {opcode: name for name, opcode in opcodes.items()}
+    opcode, operand = program.code[2 * step], program.code[2 * step + 1]
+    if opcode in (SET_SHUTTER, SET_APERTURE, SET_FILM_SPEED, SET_LUMINOSITY):
+        return f"{names[opcode]} {operand:g}"
+    return names[opcode]
+
+
+# ----------- Golden traces -----------
+
+# Where an engine's trace of a program first differs from the reference engine's.
+class Divergence:
+
+    def __init__(self, index, step, instruction, field, expected, actual):
+        self.index = index
+        self.step = step
+        self.instruction = instruction
+        self.field = field
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self):
+        return (
+            f"Program {self.index}, step {self.step} ({self.instruction}): "
+            f"{self.field} should be {self.expected}, was {self.actual}"
+        )
+
+
+def compare(expected, actual, index, program):
+    width = len(FIELDS)
+    for i, (e, a) in enumerate(zip(expected, actual)):
+        if e != a and not (math.isnan(e) and math.isnan(a)):
+            break
+    else:
+        if len(expected) == len(actual):
+            return None
+        i = min(len(expected), len(actual))
+        e = expected[i] if i < len(expected) else None
+        a = actual[i] if i < len(actual) else None
+
+    step, column = divmod(i, width)
+    field = FIELDS[column]
+    if field == "outcome":
+        e, a = (OUTCOMES[int(v)] if v is not None else None for v in (e, a))
+    return Divergence(index, step, disassemble(program, step), field, e, a)
+
+
+def record_chunk(seed, start, count, length, spec):
+    return b"".join(
+        digest(reference(generate(seed, index, length, spec), spec)) for index in range(start, start + count)
+    )
+
+
+# Replays the programs of a chunk on an engine, returning the first divergence from the reference, if any, and the
+# programs on which the engine agrees with the reference but not with the golden digests - which means that the
+# reference itself has changed since they were recorded. Only when a digest differs is the reference trace worked
+# out again, to find where.
+def replay_chunk(engine, seed, start, digests, length, spec):
+    stale = []
+    for offset in range(0, len(digests), 16):
+        index = start + offset // 16
+        program = generate(seed, index, length, spec)
+        actual = engine(program, spec)
+        if digest(actual) != digests[offset:offset + 16]:
+            divergence = compare(reference(program, spec), actual, index, program)
+            if divergence:
+                return divergence, stale
+            stale.append(index)
+    return None, stale
+
+
+# GoldenTraces records the reference engine's traces of a series of random programs, keeping only a 16-byte digest
+# of each, and replays the series on a candidate engine to check that it agrees. The programs themselves are never
+# stored: they are generated again, from the seed, whenever they are needed.
+class GoldenTraces:
+
+    def __init__(self, seed=0, length=64, spec=None, chunk_size=10_000):
+        self.seed = seed
+        self.length = length
+        self.spec = spec or ql17
+        self.chunk_size = chunk_size
+        self.digests = b""
+
+    def __len__(self):
+        return len(self.digests) // 16
+
+    def chunks(self, count):
+        return [(start, min(self.chunk_size, count - start)) for start in range(0, count, self.chunk_size)]
+
+    # Records the traces of `count` programs, in `workers` processes (or in this one, if `workers` is None).
+    def record(self, count, workers=None):
+        jobs = [(self.seed, start, size, self.length, self.spec) for start, size in self.chunks(count)]
+        if workers is None:
+            results = [record_chunk(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(record_chunk, *zip(*jobs)))
+        self.digests = b"".join(results)
+        return self
+
+    # Replays every recorded program on the engine, returning the Divergence of the first (lowest-numbered)
+    # program on which it disagrees with the reference, or None if it agrees on them all. Raises Stale if the
+    # reference no longer gives the recorded traces.
+    def replay(self, engine, workers=None):
+        jobs = [
+            (engine, self.seed, start, self.digests[start * 16:(start + size) * 16], self.length, self.spec)
+            for start, size in self.chunks(len(self))
+        ]
+        if workers is None:
+            return self.first_divergence(replay_chunk(*job) for job in jobs)
+
+        # chunks are collected in order, so the first divergence found is the first there is; the chunks
+        # still waiting to run are then cancelled
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            return self.first_divergence(executor.map(replay_chunk, *zip(*jobs)))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    # Any program whose golden digest no longer matches the reference makes the golden traces untrustworthy, so
+    # rather than a divergence, Stale is raised.
+    def first_divergence(self, results):
+        stale, first = [], None
+        for divergence, chunk_stale in results:
+            stale += chunk_stale
+            if divergence:
+                first = divergence
+                break
+        if stale:
+            shown = ", ".join(map(str, stale[:10])) + (" ..." if len(stale) > 10 else "")
+            raise self.Stale(f"The golden traces of programs {shown} are stale (camera.py has changed since recording)")
+        return first
+
+    def save(self, path):
+        header = {
+            "seed": self.seed, "length": self.length, "spec": self.spec.name, "programs": len(self),
+            "model": model_version(),
+        }
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n" + self.digests)
+
+    # Loads golden traces recorded with the given specification (the default model, unless another is given).
+    @classmethod
+    def load(cls, path, spec=None):
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            traces = cls(seed=header["seed"], length=header["length"], spec=spec)
+            if traces.spec.name != header["spec"]:
+                raise cls.WrongSpecification(f"{path} was recorded for the {header['spec']}")
+            if header.get("model") != model_version():
+                raise cls.Stale(f"{path} is stale (camera.py has changed since it was recorded)")
+            traces.digests = f.read()
+        return traces
+
+    class WrongSpecification(Exception):
+        pass
+
+    class Stale(Exception):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record golden traces, or check an engine against them")
+    parser.add_argument("path", help="the golden traces file")
+    parser.add_argument("--record", type=int, metavar="PROGRAMS", help="record this many programs' traces")
+    parser.add_argument("--engine", metavar="MODULE:NAME", help="replay the traces on this engine")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--length", type=int, default=64, help="instructions per program")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    arguments = parser.parse_args()
+
+    if arguments.record:
+        traces = GoldenTraces(seed=arguments.seed, length=arguments.length)
+        traces.record(arguments.record, workers=arguments.workers).save(arguments.path)
+        print(f"Recorded {len(traces)} traces")
+    if arguments.engine:
+        module, name = arguments.engine.split(":")
+        traces = GoldenTraces.load(arguments.path)
+        divergence = traces.replay(getattr(importlib.import_module(module), name), workers=arguments.workers)
+        print(divergence or f"{arguments.engine} agrees on all {len(traces)} programs")
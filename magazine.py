@@ -0,0 +1,121 @@
+import queue, threading
+
+from array import array
+
+from camera import Film
+
+
+# ----------- Film magazine -----------
+
+# A Magazine streams rolls of film through a camera. Loading a roll does what a photographer does: rewinds the roll
+# in the camera (unless it has been rewound already), opens the back - which resets the frame counter - swaps the
+# rolls and closes the back again. Nothing else about the camera changes; a shutter left cocked stays cocked.
+#
+# Each roll taken out is handed to `consumer` (say, a function that develops it) in a background thread. The
+# magazine then recycles the roll: its buffers are cleared in place, and it goes back into a pool of `buffers` rolls
+# that stock() draws on for the rolls to come. The consumer must take what it needs from a roll before it returns,
+# since the same roll will be loaded again.
+#
+# However many rolls are shot, no more than `buffers` rolls from stock() are ever in existence; when they are all
+# in use, stock() waits for the consumer to finish one. (Rolls loaded from anywhere else are recycled into the pool
+# too.)
+class Magazine:
+
+    def __init__(self, camera, consumer, buffers=2):
+        if buffers < 2:
+            # with only one, the roll in the camera could never be swapped for another
+            raise self.TooFewBuffers("A magazine needs at least two rolls' buffers")
+
+        self.camera = camera
+        self.consumer = consumer
+        self.loaded = None
+        self.error = None
+        self.spares = queue.SimpleQueue()
+        for _ in range(buffers):
+            self.spares.put(Film())
+        self.finished = queue.Queue(maxsize=buffers)
+        self.zeros = {}
+
+        self.thread = threading.Thread(target=self.consume, daemon=True)
+        self.thread.start()
+
+    class TooFewBuffers(Exception):
+        pass
+
+    # Yields `count` rolls of fresh film, recycled from rolls that have been shot and consumed.
+    def stock(self, count, speed=100, frames=24):
+        for _ in range(count):
+            film = self.spares.get()
+            film.speed = speed
+            if film.frames != frames:
+                film.frames = frames
+                film.exposures = array("d", [0]) * frames
+                film.fog = array("d", [0]) * frames
+            yield film
+
+    def load(self, film):
+        self.exchange(film)
+        if self.loaded is not None:
+            self.finished.put(self.loaded)
+        self.loaded = film
+
+    def exchange(self, film):
+        camera = self.camera
+        if camera.film and not camera.film.fully_rewound:
+            camera.film_rewind_mechanism.rewind()
+        camera.back.open()
+        film.camera = camera
+        camera.film = film
+        camera.back.close()
+
+    # Loads each roll in turn and calls shoot(camera) to shoot it. The last roll is taken out, and handed to the
+    # consumer, when the magazine is closed.
+    def run(self, rolls, shoot):
+        for film in rolls:
+            self.load(film)
+            shoot(self.camera)
+
+    # Takes the last roll out of the camera (leaving it with an empty roll), waits for the consumer to finish with
+    # every roll, and re-raises the first exception the consumer raised, if any.
+    def close(self):
+        if self.loaded is not None:
+            self.exchange(Film())
+            self.finished.put(self.loaded)
+            self.loaded = None
+
+        self.finished.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def consume(self):
+        while True:
+            film = self.finished.get()
+            if film is None:
+                return
+            try:
+                # once the consumer has failed, rolls are only recycled
+                if self.error is None:
+                    self.consumer(film)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.recycle(film)
+
+    def recycle(self, film):
+        if film.frames not in self.zeros:
+            self.zeros[film.frames] = array("d", [0]) * film.frames
+        zeros = self.zeros[film.frames]
+        film.frame = 0
+        film.camera = None
+        film.fully_rewound = False
+        film.ruined = False
+        film.exposures[:] = zeros
+        film.fog[:] = zeros
+        self.spares.put(film)
@@ -0,0 +1,249 @@
+import time, bisect, threading, functools
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from camera import ShutterButton, ShutterReleaseLever, Shutter, Back, Film, FilmAdvanceMechanism
+
+
+# ----------- Metrics -----------
+
+# A Metrics registry counts what the cameras in a process are doing. Each worker process keeps its own registry,
+# updated without any locking; registries from different processes are combined by sending snapshot()s to one
+# process and merge()ing them there.
+class Metrics:
+
+    # upper bounds, in seconds, of the buckets of the press latency histogram
+    buckets = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+    def __init__(self):
+        self.frames_exposed = 0
+        self.releases_blocked = 0
+        # the meter readings that caused releases to be blocked: "Under", "Over" or "None" (no reading at all)
+        self.blocked_readings = {}
+        self.films_ruined = 0
+        # exceptions raised by the mechanism, by name
+        self.refusals = {}
+        self.latency_counts = [0] * (len(self.buckets) + 1)
+        self.latency_sum = 0
+
+    def observe_latency(self, seconds):
+        self.latency_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.latency_sum += seconds
+
+    def snapshot(self):
+        return {
+            "frames_exposed": self.frames_exposed,
+            "releases_blocked": self.releases_blocked,
+            "blocked_readings": dict(self.blocked_readings),
+            "films_ruined": self.films_ruined,
+            "refusals": dict(self.refusals),
+            "latency_counts": list(self.latency_counts),
+            "latency_sum": self.latency_sum,
+        }
+
+    def merge(self, snapshot):
+        self.frames_exposed += snapshot["frames_exposed"]
+        self.releases_blocked += snapshot["releases_blocked"]
+        for reading, count in snapshot["blocked_readings"].items():
+            self.blocked_readings[reading] = self.blocked_readings.get(reading, 0) + count
+        self.films_ruined += snapshot["films_ruined"]
+        for name, count in snapshot["refusals"].items():
+            self.refusals[name] = self.refusals.get(name, 0) + count
+        # in place, since an installed registry's press wrapper holds on to the list
+        for bucket, count in enumerate(snapshot["latency_counts"]):
+            self.latency_counts[bucket] += count
+        self.latency_sum += snapshot["latency_sum"]
+        return self
+
+    # The metrics in the Prometheus text exposition format.
+    def exposition(self):
+        lines = [
+            "# HELP camera_frames_exposed_total Frames exposed by the shutter.",
+            "# TYPE camera_frames_exposed_total counter",
+            f"camera_frames_exposed_total {self.frames_exposed}",
+            "# HELP camera_releases_blocked_total Shutter releases blocked by the shutter lock lever.",
+            "# TYPE camera_releases_blocked_total counter",
+            f"camera_releases_blocked_total {self.releases_blocked}",
+            "# HELP camera_blocked_meter_readings_total Meter readings of blocked shutter releases.",
+            "# TYPE camera_blocked_meter_readings_total counter",
+        ]
+        lines += [
+            f'camera_blocked_meter_readings_total{{reading="{reading}"}} {count}'
+            for reading, count in sorted(self.blocked_readings.items())
+        ]
+        lines += [
+            "# HELP camera_films_ruined_total Films ruined by opening the back.",
+            "# TYPE camera_films_ruined_total counter",
+            f"camera_films_ruined_total {self.films_ruined}",
+            "# HELP camera_refusals_total Actions refused by the mechanism.",
+            "# TYPE camera_refusals_total counter",
+        ]
+        lines += [
+            f'camera_refusals_total{{exception="{name}"}} {count}' for name, count in sorted(self.refusals.items())
+        ]
+        lines += [
+            "# HELP camera_press_seconds Time taken by a press of the shutter button.",
+            "# TYPE camera_press_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.latency_counts):
+            cumulative += count
+            lines.append(f'camera_press_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"camera_press_seconds_sum {self.latency_sum}")
+        lines.append(f"camera_press_seconds_count {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+# ----------- Instrumenting the mechanism -----------
+
+# The methods of the mechanism are wrapped through wrap() and unwrap(), here and in monitor.py, so that either can
+# be installed and uninstalled without disturbing the other. Each method's original is kept, and whenever a wrapper
+# is added or removed, the method is built again from it, with the wrappers that are still installed (in the order
+# they were added). Properties have their setters wrapped.
+
+# (class, name): [the original, [(owner, wrapper), ...]]
+wrapped = {}
+
+
+# Wraps a method of a class: wrapper(method) returns the method to use instead.
+def wrap(cls, name, owner, wrapper):
+    if (cls, name) not in wrapped:
+        wrapped[(cls, name)] = [cls.__dict__[name], []]
+    wrapped[(cls, name)][1].append((owner, wrapper))
+    rebuild(cls, name)
+
+
+# Removes all the owner's wrappers, restoring the methods that have none left.
+def unwrap(owner):
+    for (cls, name), (original, wrappers) in list(wrapped.items()):
+        wrappers[:] = [(o, wrapper) for o, wrapper in wrappers if o != owner]
+        rebuild(cls, name)
+        if not wrappers:
+            del wrapped[(cls, name)]
+
+
+def rebuild(cls, name):
+    original, wrappers = wrapped[(cls, name)]
+    if not wrappers:
+        setattr(cls, name, original)
+        return
+
+    method = original.fset if isinstance(original, property) else original
+    for _, wrapper in wrappers:
+        method = functools.wraps(method)(wrapper(method))
+    setattr(cls, name, original.setter(method) if isinstance(original, property) else method)
+
+
+# The registry that the camera mechanism is feeding.
+registry = None
+
+
+# Starts feeding a registry from every camera in this process. The methods of the mechanism that are involved are
+# wrapped; until install() is called, the mechanism runs exactly as it does without metrics.
+def install(metrics=None):
+    global registry
+    if registry is not None:
+        uninstall()
+    registry = metrics or Metrics()
+
+    def feeding(wrapper):
+        return functools.partial(wrapper, metrics=registry)
+
+    wrap(ShutterButton, "press", "metrics", feeding(timed_press))
+    wrap(ShutterReleaseLever, "depress", "metrics", feeding(counted_depress))
+    wrap(Shutter, "close", "metrics", feeding(counted_close))
+    wrap(Back, "open", "metrics", feeding(counted_open))
+    wrap(Film, "advance", "metrics", feeding(refusals_of(Film.NoMoreFrames)))
+    wrap(Shutter, "cock", "metrics", feeding(refusals_of(Shutter.AlreadyCocked)))
+    wrap(FilmAdvanceMechanism, "advance", "metrics", feeding(refusals_of(FilmAdvanceMechanism.AlreadyAdvanced)))
+    return registry
+
+
+def uninstall():
+    global registry
+    unwrap("metrics")
+    registry = None
+
+
+# observe_latency(), done inline: it is the largest part of the cost of metrics on the press path
+def timed_press(press, metrics):
+    perf_counter, bisect_left = time.perf_counter, bisect.bisect_left
+    buckets, counts = metrics.buckets, metrics.latency_counts
+    def wrapper(self):
+        start = perf_counter()
+        try:
+            return press(self)
+        finally:
+            seconds = perf_counter() - start
+            counts[bisect_left(buckets, seconds)] += 1
+            metrics.latency_sum += seconds
+    return wrapper
+
+
+def counted_depress(depress, metrics):
+    def wrapper(self):
+        result = depress(self)
+        ecs = self.exposure_control_system
+        if ecs and ecs.shutter_lock_lever.blocks:
+            metrics.releases_blocked += 1
+            reading = ecs.meter()
+            reading = reading if reading in ("Under", "Over") else "None"
+            metrics.blocked_readings[reading] = metrics.blocked_readings.get(reading, 0) + 1
+        return result
+    return wrapper
+
+
+def counted_close(close, metrics):
+    def wrapper(self):
+        result = close(self)
+        if result:
+            metrics.frames_exposed += 1
+        return result
+    return wrapper
+
+
+def counted_open(open, metrics):
+    def wrapper(self):
+        result = open(self)
+        if result == "Film is ruined":
+            metrics.films_ruined += 1
+        return result
+    return wrapper
+
+
+def refusals_of(exception):
+    name = exception.__name__
+    def counted(method, metrics):
+        def wrapper(self):
+            try:
+                return method(self)
+            except exception:
+                metrics.refusals[name] = metrics.refusals.get(name, 0) + 1
+                raise
+        return wrapper
+    return counted
+
+
+# ----------- Endpoint -----------
+
+# Serves the registry's metrics at http://<host>:<port>/metrics from a background thread, returning the server
+# (call its shutdown() method to stop it).
+def serve(metrics, host="127.0.0.1", port=9100):
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.exposition().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *arguments):
+            pass
+
+    server = HTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
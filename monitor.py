@@ -0,0 +1,173 @@
+import queue, threading, functools
+
+import metrics
+from camera import Camera, ShutterButton, FilmAdvanceLever, Shutter, Back, FilmRewindMechanism
+
+
+# ----------- Change stream -----------
+
+# A ChangeStream tells subscribers what has changed on the cameras it is watching, rather than having them poll
+# Camera.state(). After each action on a watched camera, it compares these fields with what it last reported and,
+# if any have changed, sends subscribers (camera name, {field: new value}) with just those fields - one message per
+# action, however many parts of the mechanism it moved.
+FIELDS = (
+    "frame_counter", "cocked", "advanced", "iris_aperture", "exposure_indicator", "film_frame", "film_ruined",
+    "back_closed",
+)
+
+
+def values_of(camera):
+    ecs = camera.exposure_control_system
+    film = camera.film
+    return (
+        camera.frame_counter, ecs.shutter.cocked, camera.film_advance_mechanism.advanced, ecs.iris.aperture,
+        camera.exposure_indicator(), film.frame, film.ruined, camera.back.closed,
+    )
+
+
+class ChangeStream:
+
+    def __init__(self):
+        # id(camera): [name, camera, the values last reported]
+        self.watched = {}
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def watch(self, camera, name=None):
+        name = len(self.watched) if name is None else name
+        self.watched[id(camera)] = [name, camera, values_of(camera)]
+        return name
+
+    def unwatch(self, camera):
+        del self.watched[id(camera)]
+
+    # Returns a new Subscription, holding up to `size` messages. Unless `initial` is False, its first messages give
+    # every field of each watched camera.
+    def subscribe(self, size=1024, initial=True):
+        subscription = Subscription(size)
+        if initial:
+            for name, _, values in self.watched.values():
+                subscription.put(name, dict(zip(FIELDS, values)))
+        with self.lock:
+            self.subscribers = self.subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s is not subscription]
+
+    # Reports any changes to the camera since they were last reported. Actions are checked automatically once
+    # install() has been called; call this after changing a camera in any other way (its scene luminosity, say).
+    def check(self, camera):
+        watched = self.watched.get(id(camera))
+        if watched is None:
+            return
+
+        name, _, last = watched
+        values = values_of(camera)
+        if values == last:
+            return
+
+        watched[2] = values
+        changes = {field: value for field, value, old in zip(FIELDS, values, last) if value != old}
+        for subscription in self.subscribers:
+            subscription.put(name, changes)
+
+
+# A Subscription delivers a ChangeStream's messages through a queue of `size` messages. The cameras are never held
+# up by a slow subscriber: once its queue is full, further changes to each camera are merged, so that the
+# subscriber gets one message bringing it up to date with each of them when it catches up. Messages about a camera
+# always arrive in order; nothing is lost, and the subscription holds no more than `size` messages plus one per
+# camera.
+class Subscription:
+
+    def __init__(self, size=1024):
+        self.queue = queue.Queue(maxsize=size)
+        # camera name: changes merged while the queue was full
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def put(self, name, changes):
+        with self.lock:
+            if name in self.pending:
+                changes = {**self.pending.pop(name), **changes}
+            try:
+                self.queue.put_nowait((name, changes))
+            except queue.Full:
+                self.pending[name] = changes
+
+    # Returns the next message, (camera name, {field: value}), waiting for one as queue.Queue.get() does.
+    def get(self, block=True, timeout=None):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                if self.pending:
+                    name = next(iter(self.pending))
+                    return name, self.pending.pop(name)
+        return self.queue.get(block, timeout)
+
+    # Returns all the messages waiting, without waiting for more.
+    def drain(self):
+        messages = []
+        while True:
+            try:
+                messages.append(self.get(block=False))
+            except queue.Empty:
+                return messages
+
+
+# ----------- Watching the mechanism -----------
+
+# The stream that actions on cameras are reported to.
+stream = None
+
+# the cameras (by id) in the middle of an action, whose changes are reported only when it is over
+acting = set()
+
+
+# Starts reporting actions on watched cameras to a stream. As with metrics.install(), the methods of the mechanism
+# that are involved are wrapped (with metrics.wrap(), so that both can be installed at once); until install() is
+# called, the mechanism runs exactly as it does without it.
+def install(changes=None):
+    global stream
+    if stream is not None:
+        uninstall()
+    stream = changes or ChangeStream()
+
+    def wrap(cls, name, camera_of):
+        metrics.wrap(cls, name, "monitor", functools.partial(reported, camera_of=camera_of, stream=stream))
+
+    wrap(ShutterButton, "press", lambda button: button.camera)
+    wrap(FilmAdvanceLever, "wind", lambda lever: lever.camera)
+    wrap(Shutter, "close", lambda shutter: shutter.exposure_control_system and shutter.exposure_control_system.camera)
+    wrap(Back, "open", lambda back: back.camera)
+    wrap(Back, "close", lambda back: back.camera)
+    wrap(FilmRewindMechanism, "rewind", lambda mechanism: mechanism.camera)
+    wrap(Camera, "reset", lambda camera: camera)
+    wrap(Camera, "aperture", lambda camera: camera)
+    wrap(Camera, "shutter_speed", lambda camera: camera)
+    wrap(Camera, "film_speed", lambda camera: camera)
+    return stream
+
+
+def uninstall():
+    global stream
+    metrics.unwrap("monitor")
+    stream = None
+
+
+def reported(method, camera_of, stream):
+    watched = stream.watched
+    def wrapper(self, *arguments):
+        camera = camera_of(self)
+        if not camera or id(camera) not in watched or id(camera) in acting:
+            return method(self, *arguments)
+
+        acting.add(id(camera))
+        try:
+            return method(self, *arguments)
+        finally:
+            acting.discard(id(camera))
+            stream.check(camera)
+    return wrapper
@@ -0,0 +1,133 @@
+import os, contextlib
+from array import array
+
+from camera import Camera
+
+
+# ----------- Instructions -----------
+
+# A program is a flat array of (opcode, operand) pairs. Instructions that don't need an operand have 0.
+SET_SHUTTER = 1       # operand: the denominator of the shutter speed marked on the ring (125 for 1/125)
+SET_APERTURE = 2      # operand: an ƒ-number, or 0 for "A"
+SET_FILM_SPEED = 3    # operand: ISO
+SET_LUMINOSITY = 4    # operand: scene luminosity, cd/m^2
+WIND = 5
+PRESS = 6
+CAP_ON = 7
+CAP_OFF = 8
+OPEN_BACK = 9
+CLOSE_BACK = 10
+REWIND = 11
+
+opcodes = {
+    "SET_SHUTTER": SET_SHUTTER, "SET_APERTURE": SET_APERTURE, "SET_FILM_SPEED": SET_FILM_SPEED,
+    "SET_LUMINOSITY": SET_LUMINOSITY, "WIND": WIND, "PRESS": PRESS, "CAP_ON": CAP_ON, "CAP_OFF": CAP_OFF,
+    "OPEN_BACK": OPEN_BACK, "CLOSE_BACK": CLOSE_BACK, "REWIND": REWIND,
+}
+
+
+class Program:
+
+    def __init__(self, code):
+        self.code = array("d", code)
+
+    # Assembles a program from instructions such as ("SET_SHUTTER", 125), ("SET_APERTURE", "A") or ("WIND",).
+    @classmethod
+    def assemble(cls, instructions):
+        code = []
+        for instruction in instructions:
+            name, *operand = instruction
+            if name not in opcodes:
+                raise cls.UnknownInstruction(name)
+            operand = operand[0] if operand else 0
+            code += [opcodes[name], 0 if operand == "A" else operand]
+        return cls(code)
+
+    class UnknownInstruction(Exception):
+        pass
+
+    def __len__(self):
+        return len(self.code) // 2
+
+    # Checks every setting in the program against the camera's specification, raising the exception the camera
+    # would raise - before anything has been done, rather than partway through a roll.
+    def validate(self, spec):
+        code = self.code
+        for i in range(0, len(code), 2):
+            opcode, operand = code[i], code[i + 1]
+            if opcode == SET_SHUTTER and operand not in spec.shutter_speed_index:
+                raise Camera.NonExistentShutterSpeed(f"Instruction {i // 2}: {spec.shutter_speed_error}")
+            elif opcode == SET_APERTURE and operand and not (
+                spec.minimum_aperture <= operand <= spec.maximum_aperture
+            ):
+                raise Camera.ApertureOutOfRange(f"Instruction {i // 2}: {spec.aperture_error}")
+            elif opcode == SET_FILM_SPEED and operand not in spec.film_speeds:
+                raise Camera.NonExistentFilmSpeed(f"Instruction {i // 2}: {spec.film_speed_error}")
+            elif not 1 <= opcode <= REWIND:
+                raise self.UnknownInstruction(f"Instruction {i // 2}: opcode {opcode}")
+
+
+# ----------- Interpreter -----------
+
+# Validates the program and runs it on the camera, returning the number of frames exposed and the number of presses
+# blocked by the shutter lock. The shutter closes as soon as it has opened, rather than waiting for its timer and,
+# unless `quiet` is False, the camera's reports of what it is doing are discarded.
+def run(program, camera, quiet=True):
+    program.validate(camera.spec)
+
+    if quiet:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return _run(program, camera)
+    return _run(program, camera)
+
+
+def _run(program, camera):
+    spec = camera.spec
+    shutter_speeds = spec.shutter_speed_index
+    shutter = camera.exposure_control_system.shutter
+    wind = camera.film_advance_lever.wind
+    press = camera.shutter_button.press
+    close = shutter.close
+    lock = camera.exposure_control_system.shutter_lock_lever
+    environment = camera.environment
+    lens_cap = camera.lens_cap
+
+    exposed = blocked = 0
+    timed, shutter.timed = shutter.timed, False
+    try:
+        code = program.code
+        for i in range(0, len(code), 2):
+            opcode = code[i]
+            if opcode == WIND:
+                wind()
+            elif opcode == PRESS:
+                press()
+                # a press that did not trip the shutter was only blocked if the lock stopped it; an uncocked
+                # shutter simply does nothing
+                if close():
+                    exposed += 1
+                elif lock.blocks:
+                    blocked += 1
+            elif opcode == SET_SHUTTER:
+                camera.shutter_speed = shutter_speeds[code[i + 1]]
+            elif opcode == SET_APERTURE:
+                operand = code[i + 1]
+                camera.aperture = operand if operand else "A"
+            elif opcode == SET_LUMINOSITY:
+                environment.scene_luminosity = code[i + 1]
+            elif opcode == SET_FILM_SPEED:
+                camera.film_speed = int(code[i + 1])
+            elif opcode == CAP_ON:
+                lens_cap.on = True
+            elif opcode == CAP_OFF:
+                lens_cap.on = False
+            elif opcode == OPEN_BACK:
+                camera.back.open()
+            elif opcode == CLOSE_BACK:
+                camera.back.close()
+            elif opcode == REWIND:
+                camera.film_rewind_mechanism.rewind()
+    finally:
+        shutter.timed = timed
+
+    return exposed, blocked
@@ -0,0 +1,98 @@
+import mmap
+from array import array
+
+from development import curve_for
+
+
+# ----------- Rendered rolls -----------
+
+# A RenderedRoll holds an image of every frame of a roll of film, in a memory-mapped file on disk, so that a whole
+# roll at a real resolution never needs to be in memory at once. The file is simply frames x height x width
+# float32 values (in the machine's byte order), each the density of the negative at that point.
+#
+# Frames are returned as memoryviews of the mapped file (indexed [row, column]), so reading or slicing a frame
+# copies nothing. All views of the roll's frames must have been released before the roll is closed.
+class RenderedRoll:
+
+    def __init__(self, path, frames=24, width=360, height=240, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self.frames = frames
+        self.width = width
+        self.height = height
+        self.frame_size = width * height
+        size = frames * self.frame_size * 4
+
+        if readonly:
+            self.file = open(path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+        else:
+            self.file = open(path, "w+b")
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+
+        self.pixels = memoryview(self.map).cast("f")
+
+    def __getitem__(self, frame):
+        self.check(frame)
+        start = frame * self.frame_size
+        return self.pixels[start:start + self.frame_size].cast("B").cast("f", (self.height, self.width))
+
+    def check(self, frame):
+        if not 0 <= frame < self.frames:
+            raise IndexError(f"No frame {frame} (of {self.frames})")
+
+    def row(self, frame, row):
+        start = frame * self.frame_size + row * self.width
+        return self.pixels[start:start + self.width]
+
+    # Renders the image of a frame exposed to a scene, through the given iris aperture and shutter timer, on film
+    # of the given speed. The scene's luminance is either a single value for the whole scene, or a 2D map of
+    # values (a sequence of rows, of the roll's height and width).
+    def expose(self, frame, luminance, aperture, timer, film_speed):
+        self.check(frame)
+        curve = curve_for(film_speed)
+        factor = timer / aperture ** 2
+        start = frame * self.frame_size
+
+        if isinstance(luminance, (int, float)):
+            density = curve.density(luminance * factor)
+            self.pixels[start:start + self.frame_size] = array("f", [density]) * self.frame_size
+            return
+
+        if len(luminance) != self.height:
+            raise self.WrongSize(f"Luminance map must have {self.height} rows")
+        for y, row in enumerate(luminance):
+            if len(row) != self.width:
+                raise self.WrongSize(f"Luminance map rows must have {self.width} values")
+            self.row(frame, y)[:] = curve.densities_of([value * factor for value in row])
+
+    class WrongSize(Exception):
+        pass
+
+    # Renders the frame the camera has just exposed, from its current environment, iris, shutter timer and film.
+    # A luminance map can be supplied in place of the environment's scene luminosity.
+    def capture(self, camera, luminance=None):
+        if not camera.film.frame:
+            raise IndexError("No frame of the camera's film has been exposed yet")
+
+        ecs = camera.exposure_control_system
+        if luminance is None:
+            luminance = 0 if camera.lens_cap.on else camera.environment.scene_luminosity
+        self.expose(camera.film.frame - 1, luminance, ecs.iris.aperture, ecs.shutter.timer, camera.film.speed)
+
+    def flush(self):
+        if not self.readonly:
+            self.map.flush()
+
+    def close(self):
+        self.flush()
+        self.pixels.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
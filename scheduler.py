@@ -0,0 +1,127 @@
+import heapq, itertools, os, contextlib
+
+from camera import Battery, REFUSALS
+
+
+# ----------- Discrete-event scheduler -----------
+
+# A Scheduler runs any number of cameras against one simulated clock. Actions on cameras are scheduled as
+# timestamped events, and run in time order (and in the order they were scheduled, for events at the same time)
+# without any real waiting.
+#
+# The shutters of cameras added to the scheduler are untimed: pressing the shutter button leaves the shutter open,
+# and the scheduler closes it once its timer has run on the simulated clock. Their backs are timed by the simulated
+# clock too, so that film is fogged for as long as a back is left open, and so are their meter batteries, which run
+# down as simulated time passes until the meter cuts out. (No event is scheduled for that: Battery.time_of_cutoff()
+# tells when it will happen, and it is usually so far ahead that run() would be kept going for it.)
+class Scheduler:
+
+    # exceptions raised by a camera refusing an action; they are recorded in `refusals` rather than
+    # interrupting the simulation
+    refused = REFUSALS
+
+    def __init__(self):
+        self.now = 0
+        self.queue = []
+        self.sequence = itertools.count()
+        self.refusals = []
+        self.processed = 0
+
+    def add(self, camera):
+        camera.exposure_control_system.shutter.timed = False
+        camera.back.clock = self.clock
+        battery = camera.exposure_control_system.battery
+        if isinstance(battery, Battery):
+            # the battery has been running down since it was put in the camera, not since time 0 on this clock
+            battery.clock = self.clock
+            battery.updated = self.now
+        return camera
+
+    def clock(self):
+        return self.now
+
+    def schedule(self, time, camera, action, *arguments):
+        if action not in self.actions:
+            raise self.UnknownAction(f"No such action: {action}; actions are {', '.join(self.actions)}")
+        if time < self.now:
+            raise self.InThePast(f"Cannot schedule {action} at {time}; the time is now {self.now}")
+
+        heapq.heappush(self.queue, (time, next(self.sequence), camera, action, arguments))
+
+    class InThePast(Exception):
+        pass
+
+    class UnknownAction(Exception):
+        pass
+
+    # Schedules `frames` exposures starting at `start`, one every `interval` seconds; each is a wind followed by
+    # a press.
+    def burst(self, camera, start, frames, interval):
+        for frame in range(frames):
+            self.schedule(start + frame * interval, camera, "wind")
+            self.schedule(start + frame * interval, camera, "press")
+
+    # Processes events in time order until there are none left, or the next is later than `until`. Unless
+    # `quiet` is False, the cameras' reports of what they are doing are discarded.
+    def run(self, until=None, quiet=True):
+        if quiet:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                return self._run(until)
+        return self._run(until)
+
+    def _run(self, until):
+        queue = self.queue
+        actions = self.actions
+        pop = heapq.heappop
+
+        while queue and (until is None or queue[0][0] <= until):
+            time, _, camera, action, arguments = pop(queue)
+            self.now = time
+            try:
+                actions[action](self, camera, *arguments)
+            except self.refused as exception:
+                self.refusals.append((time, camera, action, exception))
+            self.processed += 1
+
+        if until is not None:
+            self.now = max(self.now, until)
+        return self.processed
+
+    # ----------- Actions -----------
+
+    def wind(self, camera):
+        camera.film_advance_lever.wind()
+
+    def press(self, camera):
+        shutter = camera.exposure_control_system.shutter
+        was_closed = shutter.closed
+        camera.shutter_button.press()
+        # only a press that opened the shutter closes it; pressing while it is already open must not cut short
+        # a later exposure
+        if was_closed and not shutter.closed:
+            self.schedule(self.now + shutter.timer, camera, "close shutter")
+
+    def close_shutter(self, camera):
+        camera.exposure_control_system.shutter.close()
+
+    def open_back(self, camera):
+        camera.back.open()
+
+    def close_back(self, camera):
+        camera.back.close()
+
+    def rewind(self, camera):
+        camera.film_rewind_mechanism.rewind()
+
+    def set_luminosity(self, camera, scene_luminosity):
+        camera.environment.scene_luminosity = scene_luminosity
+
+    actions = {
+        "wind": wind,
+        "press": press,
+        "close shutter": close_shutter,
+        "open back": open_back,
+        "close back": close_back,
+        "rewind": rewind,
+        "luminosity": set_luminosity,
+    }
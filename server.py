@@ -0,0 +1,203 @@
+import os, json, asyncio, argparse, itertools, contextlib
+
+from camera import Camera, REFUSALS
+
+
+# ----------- Control server -----------
+
+# A CameraServer keeps any number of cameras, addressed by id, and lets other processes control them over a local
+# TCP or Unix socket.
+#
+# Each request is one line of JSON holding a list of commands, which are run in order in a single round trip:
+#
+#     {"id": 1, "commands": [{"command": "create"}, {"command": "wind", "camera": 1}, ...]}
+#
+# and each response is one line of JSON with a result for each command:
+#
+#     {"id": 1, "results": [{"result": 1}, {"result": null}, ...]}
+#
+# A command the camera refuses (for example, winding it twice) gives {"error": <exception>, "message": ...} as its
+# result, and the batch carries on.
+#
+# Commands are:
+#
+# * create: build a camera, returning its id
+# * delete: remove a camera
+# * set: change any of shutter_speed (seconds, or "1/125"), aperture, film_speed, scene_luminosity, lens_cap_on
+# * wind: wind the film advance lever
+# * press: press the shutter button; the shutter is closed again at once, without waiting for its timer
+# * state: return a snapshot of the camera's state
+#
+# A request or response may be up to `limit` bytes long (asyncio's own limit of 64 KiB is only enough for a batch of
+# a hundred or so states). A longer request is answered with a BadRequest, and the connection carries on.
+LIMIT = 2 ** 24
+
+
+class CameraServer:
+
+    refused = REFUSALS
+
+    def __init__(self, limit=LIMIT):
+        self.cameras = {}
+        self.ids = itertools.count(1)
+        self.limit = limit
+
+    # ----------- Commands -----------
+
+    def create(self):
+        camera = Camera()
+        camera.exposure_control_system.shutter.timed = False
+        id = next(self.ids)
+        self.cameras[id] = camera
+        return id
+
+    def delete(self, camera):
+        del self.cameras[camera]
+
+    def set(self, camera, **settings):
+        c = self.cameras[camera]
+        for setting, value in settings.items():
+            if setting == "shutter_speed":
+                if isinstance(value, str):
+                    value = self.shutter_speed(c, value)
+                c.shutter_speed = value
+            elif setting in ("aperture", "film_speed"):
+                setattr(c, setting, value)
+            elif setting == "scene_luminosity":
+                c.environment.scene_luminosity = value
+            elif setting == "lens_cap_on":
+                c.lens_cap.on = value
+            else:
+                raise self.UnknownSetting(setting)
+
+    # "1/125" is looked up among the camera's shutter speeds; anything else is left for the camera to refuse
+    @staticmethod
+    def shutter_speed(camera, value):
+        denominator = value.rpartition("/")[2].strip()
+        if not denominator.isdigit():
+            return value
+        return camera.spec.shutter_speed_index.get(int(denominator), value)
+
+    def wind(self, camera):
+        self.cameras[camera].film_advance_lever.wind()
+
+    def press(self, camera):
+        c = self.cameras[camera]
+        c.shutter_button.press()
+        return c.exposure_control_system.shutter.close()
+
+    def state(self, camera):
+        return self.cameras[camera].snapshot()
+
+    commands = {"create": create, "delete": delete, "set": set, "wind": wind, "press": press, "state": state}
+
+    class UnknownSetting(Exception):
+        pass
+
+    # Runs a batch of commands, returning a result for each.
+    def run(self, commands):
+        results = []
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for command in commands:
+                arguments = dict(command)
+                name = arguments.pop("command", None)
+                try:
+                    results.append({"result": self.commands[name](self, **arguments)})
+                except KeyError as exception:
+                    results.append({"error": "KeyError", "message": f"No such command or camera: {exception}"})
+                except (TypeError, ValueError, self.UnknownSetting) + self.refused as exception:
+                    results.append({"error": type(exception).__name__, "message": str(exception)})
+        return results
+
+    # ----------- Serving -----------
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await self.read_request(reader)
+                    if not line:
+                        break
+                    request = json.loads(line)
+                    response = {"id": request.get("id"), "results": self.run(request["commands"])}
+                except (ValueError, KeyError, TypeError, AttributeError, self.TooLong) as exception:
+                    response = {"error": "BadRequest", "message": str(exception)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    # Returns the next line, or b"" at the end of the stream. A line longer than the limit is read and thrown away,
+    # so that the next request starts on the next line, and TooLong is raised.
+    async def read_request(self, reader):
+        try:
+            return await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as incomplete:
+            return incomplete.partial
+        except asyncio.LimitOverrunError as overrun:
+            consumed = overrun.consumed
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b"\n")
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as overrun:
+                consumed = overrun.consumed
+        raise self.TooLong(f"Requests are limited to {self.limit} bytes")
+
+    class TooLong(Exception):
+        pass
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        if path:
+            return await asyncio.start_unix_server(self.handle, path=path, limit=self.limit)
+        return await asyncio.start_server(self.handle, host=host, port=port, limit=self.limit)
+
+
+# ----------- Client -----------
+
+class CameraClient:
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765, path=None, limit=LIMIT):
+        if path:
+            return cls(*await asyncio.open_unix_connection(path, limit=limit))
+        return cls(*await asyncio.open_connection(host, port, limit=limit))
+
+    # Sends a batch of commands and waits for their results.
+    async def call(self, commands):
+        self.writer.write(json.dumps({"id": next(self.ids), "commands": commands}).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if "error" in response:
+            raise self.BadRequest(response["message"])
+        return response["results"]
+
+    class BadRequest(Exception):
+        pass
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve(host, port, path):
+    server = await CameraServer().start(host, port, path)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve cameras for control by other processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket rather than TCP")
+    arguments = parser.parse_args()
+    asyncio.run(serve(arguments.host, arguments.port, arguments.unix))
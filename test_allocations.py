@@ -0,0 +1,51 @@
+import contextlib
+
+import pytest
+
+from camera import Camera
+from allocations import AllocationProfile, OverBudget, Discard, profile_camera, allocation_budget
+
+
+class TestAllocationProfile(object):
+
+    def test_actions_are_profiled(self):
+        profile = profile_camera()
+        assert set(profile.actions) == {"construct", "wind", "press", "state"}
+        assert profile.actions["wind"].calls == profile.actions["press"].calls == 24
+        assert profile.actions["construct"].size_per_call > 0
+        # construction allocates more than anything else, and the report is ranked by peak allocation
+        report = profile.report()
+        assert report.splitlines()[1].startswith("construct")
+        assert "camera.py:" in report
+
+    def test_actions_need_tracing(self):
+        with pytest.raises(AllocationProfile.NotTracing):
+            with AllocationProfile().action("construct"):
+                pass
+
+    def test_exceeding_a_budget(self):
+        with pytest.raises(OverBudget, match="bytes retained"):
+            with allocation_budget(size=1000):
+                retained = [0] * 1000
+        with pytest.raises(OverBudget, match="peak bytes"):
+            with allocation_budget(peak=1000, size=1000):
+                [0] * 1000
+
+
+class TestBudgets(object):
+
+    # once the camera has settled into shooting, winding on and pressing the shutter button retain nothing of
+    # note, and allocate little on the way
+    def test_wind_and_press(self):
+        c = Camera()
+        c.exposure_control_system.shutter.timed = False
+        with contextlib.redirect_stdout(Discard()):
+            for _ in range(2):
+                c.film_advance_lever.wind()
+                c.shutter_button.press()
+                c.exposure_control_system.shutter.close()
+            with allocation_budget(peak=1024, size=256):
+                c.film_advance_lever.wind()
+            with allocation_budget(peak=1024, size=256):
+                c.shutter_button.press()
+                c.exposure_control_system.shutter.close()
@@ -0,0 +1,102 @@
+import os, threading
+
+import pytest
+
+import cache
+from cache import Scenario, ScenarioCache
+
+
+class TestScenario(object):
+
+    def test_outcomes(self):
+        scenario = Scenario([(1/125, "A", 4096), (1/125, 8, 16384), (1/125, "A", 16384)], open_back_after=2)
+        outcomes = scenario.run()
+        assert [o["exposed"] for o in outcomes] == [True, True, False]
+        assert [o["blocked"] for o in outcomes] == [False, False, True]
+        assert [o["ruined"] for o in outcomes] == [False, True, True]
+        assert outcomes[0]["ev"] == pytest.approx(15)
+        assert outcomes[1]["ev"] == pytest.approx(13)
+        assert outcomes[2]["ev"] is None
+
+    def test_key_depends_on_scenario_and_version(self):
+        scenario = Scenario([(1/125, "A", 4096)])
+        assert scenario.key("1") == Scenario([(1/125, "A", 4096)]).key("1")
+        assert scenario.key("1") != Scenario([(1/125, "A", 4095)]).key("1")
+        assert scenario.key("1") != Scenario([(1/125, "A", 4096)], film_speed=400).key("1")
+        assert scenario.key("1") != scenario.key("2")
+
+
+class TestScenarioCache(object):
+
+    def test_repeated_scenario_is_not_run_again(self, tmp_path, monkeypatch):
+        results = ScenarioCache(tmp_path)
+        scenario = Scenario([(1/125, "A", 4096)] * 3)
+        outcomes = results.run(scenario)
+
+        monkeypatch.setattr(Scenario, "run", lambda self: pytest.fail("scenario was run again"))
+        assert results.run(Scenario([(1/125, "A", 4096)] * 3)) == outcomes
+        # and from a new cache on the same directory
+        assert ScenarioCache(tmp_path).run(scenario) == outcomes
+
+    def test_change_of_camera_model_invalidates_results(self, tmp_path, monkeypatch):
+        scenario = Scenario([(1/125, "A", 4096)])
+        ScenarioCache(tmp_path).run(scenario)
+        monkeypatch.setattr(cache, "model_version", lambda: "changed")
+        assert ScenarioCache(tmp_path).get(scenario) is None
+
+    def test_change_of_scenario_rules_invalidates_results(self, tmp_path, monkeypatch):
+        scenario = Scenario([(1/125, "A", 4096)])
+        ScenarioCache(tmp_path).run(scenario)
+        source_version = cache.source_version
+        monkeypatch.setattr(
+            cache, "source_version", lambda path: "changed" if path == cache.__file__ else source_version(path)
+        )
+        assert ScenarioCache(tmp_path).get(scenario) is None
+
+    def test_processes_can_write_the_same_entry_at_once(self, tmp_path):
+        scenario = Scenario([(1/125, "A", 4096)])
+        outcomes = scenario.run()
+        errors = []
+
+        def write():
+            results = ScenarioCache(tmp_path)
+            try:
+                for _ in range(200):
+                    results.put(scenario, outcomes)
+            except Exception as e:
+                errors.append(e)
+
+        writers = [threading.Thread(target=write) for _ in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        assert errors == []
+        assert ScenarioCache(tmp_path).get(scenario) == outcomes
+        assert os.listdir(tmp_path) == [scenario.key(ScenarioCache(tmp_path).version) + ".json"]
+
+    def test_least_recently_used_are_evicted(self, tmp_path):
+        scenarios = [Scenario([(1/125, "A", luminosity)]) for luminosity in (1024, 2048, 4096)]
+        results = ScenarioCache(tmp_path)
+        results.run(scenarios[0])
+        size = results.size
+        results.max_size = size * 2
+
+        results.run(scenarios[1])
+        os.utime(tmp_path / (scenarios[0].key(results.version) + ".json"), ns=(0, 0))
+        os.utime(tmp_path / (scenarios[1].key(results.version) + ".json"), ns=(1, 1))
+        results.get(scenarios[0])
+        results.run(scenarios[2])
+
+        assert results.size <= results.max_size
+        assert results.get(scenarios[0]) is not None
+        assert results.get(scenarios[1]) is None
+        assert results.get(scenarios[2]) is not None
+
+    def test_damaged_entry_is_forgotten(self, tmp_path):
+        scenario = Scenario([(1/125, "A", 4096)])
+        results = ScenarioCache(tmp_path)
+        results.run(scenario)
+        (tmp_path / (scenario.key(results.version) + ".json")).write_text("{")
+        assert results.get(scenario) is None
+        assert results.size == 0
@@ -1,8 +1,9 @@
-import pytest, math
+import pytest, math, io, copy, json, pickle, random, contextlib
 
 from camera import (
     Camera, ShutterButton, FilmAdvanceLever, Shutter, FilmAdvanceMechanism, LightMeter, ExposureControlSystem,
-    ShutterReleaseLever, ExposureLevelLever, ExposureBoundsLever, EELever, Film
+    ShutterReleaseLever, ExposureLevelLever, ExposureBoundsLever, EELever, Film, exposure_chart, CameraSpec, ql17,
+    Battery
     )
 
 class TestCamera(object):
@@ -73,6 +74,99 @@ class TestCamera(object):
         with pytest.raises(c.ApertureOutOfRange):
             c.aperture = 22
 
+    def test_aperture_bracket(self):
+        c = Camera()
+        c.environment.scene_luminosity = 1024
+        assert c.bracket(frames=3, step=1) == [
+            (1/125, pytest.approx(8 * math.sqrt(2))), (1/125, pytest.approx(8)), (1/125, pytest.approx(8 / math.sqrt(2)))
+        ]
+        assert c.frame_counter == 3
+        assert [pytest.approx(e) for e in c.film.exposures[:3]] == [1024 / 128 / 128, 1024 / 128 / 64, 1024 / 128 / 32]
+        assert c.aperture == "A"
+        assert c.exposure_control_system.mode == "Shutter priority"
+
+    def test_shutter_bracket(self):
+        c = Camera()
+        c.environment.scene_luminosity = 1024
+        assert c.bracket(frames=3, step=1, vary="shutter") == [
+            (1/250, pytest.approx(8)), (1/125, pytest.approx(8)), (1/60, pytest.approx(8))
+        ]
+        assert c.shutter_speed == 1/125
+        assert c.exposure_control_system.shutter.timer == 1/128
+
+    def test_shutter_bracket_of_an_even_number_of_frames(self):
+        c = Camera()
+        c.environment.scene_luminosity = 1024
+        # offsets of ±0.5 and ±1.5 EV fall between the shutter speeds
+        for frames in (2, 4):
+            with pytest.raises(c.BracketOutOfRange):
+                c.bracket(frames=frames, step=1, vary="shutter")
+        # but not with steps of 2 EV
+        assert c.bracket(frames=2, step=2, vary="shutter") == [(1/250, pytest.approx(8)), (1/60, pytest.approx(8))]
+        assert c.frame_counter == 2
+
+    def test_brackets_out_of_range_are_rejected_before_shooting(self):
+        c = Camera()
+        # ƒ/16 is the metered aperture, so there's no room for less exposure
+        with pytest.raises(c.BracketOutOfRange):
+            c.bracket(frames=3, step=1)
+        c.environment.scene_luminosity = 16384
+        with pytest.raises(c.BracketOutOfRange):
+            c.bracket(frames=3, step=1, vary="shutter")
+        c.environment.scene_luminosity = 1024
+        c.shutter_speed = 1/500
+        with pytest.raises(c.BracketOutOfRange):
+            c.bracket(frames=3, step=1, vary="shutter")
+        with pytest.raises(c.BracketOutOfRange):
+            c.bracket(frames=3, step=0.5, vary="shutter")
+        c.film.frame = 22
+        with pytest.raises(Film.NoMoreFrames):
+            c.bracket(frames=3, step=0.5)
+        assert c.frame_counter == 0
+        assert c.film_advance_mechanism.advanced == False
+
+    def test_bracket_is_rejected_while_the_shutter_lock_is_engaged(self):
+        c = Camera()
+        c.environment.scene_luminosity = 16384
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        assert c.exposure_control_system.shutter_lock_lever.blocks
+        c.environment.scene_luminosity = 1024
+        with pytest.raises(c.BracketOutOfRange, match="lock"):
+            c.bracket(frames=3)
+        assert list(c.film.exposures[:3]) == [0, 0, 0]
+        assert c.frame_counter == 1
+
+    def test_reset_restores_factory_state(self):
+        c = Camera()
+        film = c.film
+        c.film_speed = 400
+        c.shutter_speed = 1/30
+        c.aperture = 4
+        c.lens_cap.on = True
+        c.environment.scene_luminosity = 64
+        c.film_advance_lever.wind()
+        c.back.open()
+        c.reset()
+
+        fresh = Camera()
+        assert c.film is film
+        assert (c.film_speed, c.shutter_speed, c.aperture) == (100, 1/125, "A")
+        assert c.frame_counter == 0
+        assert c.back.closed == True
+        assert c.lens_cap.on == False
+        assert c.film_advance_mechanism.advanced == False
+        assert (c.film.frame, c.film.ruined, c.film.fully_rewound) == (0, False, False)
+        assert c.environment.scene_luminosity == 4096
+        ecs, fresh_ecs = c.exposure_control_system, fresh.exposure_control_system
+        assert ecs.mode == fresh_ecs.mode
+        assert ecs.film_speed == fresh_ecs.film_speed
+        assert ecs.shutter.timer == fresh_ecs.shutter.timer
+        assert ecs.shutter.cocked == fresh_ecs.shutter.cocked
+        assert ecs.iris.aperture == fresh_ecs.iris.aperture
+        assert ecs.aperture_set_lever.aperture == fresh_ecs.aperture_set_lever.aperture
+        assert c.exposure_indicator() == fresh.exposure_indicator()
+
 
 class TestShutterButton(object):
 
@@ -209,6 +303,67 @@ class TestLightMeter(object):
         assert c.exposure_control_system.light_meter.reading() == 4096
 
 
+class TestBattery(object):
+
+    def test_fresh_battery_gives_exact_readings(self):
+        c = Camera()
+        assert c.exposure_control_system.light_meter.reading() == 4096
+        assert str(c.exposure_control_system.battery) == "1.44"
+
+    def test_meter_activations_drain_battery(self):
+        c = Camera()
+        battery = c.exposure_control_system.battery
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        assert battery.charge() == pytest.approx(battery.capacity - battery.activation_drain)
+
+    @pytest.mark.parametrize("battery", [1.44, None])
+    def test_reset_fits_a_battery_in_place_of_a_number_or_none(self, battery):
+        c = Camera()
+        ecs = c.exposure_control_system
+        ecs.battery = ecs.light_meter.battery = battery
+        c.reset()
+        assert isinstance(ecs.battery, Battery)
+        assert ecs.light_meter.battery is ecs.battery
+        assert ecs.battery.charge() == ecs.battery.capacity
+
+    def test_flagging_battery_makes_meter_under_read(self):
+        battery = Battery(capacity=10, knee=0.5)
+        battery._charge = 2.5
+        assert battery.voltage() == pytest.approx(1.22)
+        l = LightMeter(incident_light=1000, battery=battery)
+        assert l.reading() == pytest.approx(1000 * 1.22 / 1.44)
+
+    def test_meter_cuts_off_and_locks_shutter(self):
+        c = Camera()
+        battery = c.exposure_control_system.battery
+        battery._charge = 0.05 * battery.capacity
+        assert not battery
+        assert c.exposure_control_system.light_meter.reading() is None
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        assert c.exposure_control_system.shutter.cocked == True
+
+    def test_time_drain_is_worked_out_lazily(self):
+        now = [0]
+        battery = Battery(capacity=100, idle_drain=1, clock=lambda: now[0])
+        now[0] = 30
+        assert battery.charge() == 70
+        assert battery.time_of_cutoff() == pytest.approx(100 - 100 * 0.2 * 0.2 / 0.44)
+        now[0] = 10**9
+        assert battery.charge() == 0
+        assert not battery
+
+    def test_camera_reset_replaces_battery(self):
+        c = Camera()
+        battery = c.exposure_control_system.battery
+        battery._charge = 0
+        c.reset()
+        assert c.exposure_control_system.battery is battery
+        assert battery.charge() == battery.capacity
+        assert c.exposure_control_system.light_meter.battery is battery
+
+
 class TestExposureControlSystem(object):
 
     def test_measured_ev(self):
@@ -285,6 +440,33 @@ class TestExposureControlSystem(object):
         for sl in range(0, 17000, 1000):
             assert  c.exposure_indicator() == c.exposure_control_system.read_meter()
 
+    def test_derived_values_are_only_worked_out_again_when_inputs_change(self, monkeypatch):
+        c = Camera()
+        ecs = c.exposure_control_system
+        derivations = []
+        derive = ecs.derive
+        monkeypatch.setattr(ecs, "derive", lambda *inputs: derivations.append(inputs) or derive(*inputs))
+
+        for _ in range(100):
+            c.exposure_indicator()
+            ecs.measured_ev()
+            ecs.exposure_value()
+        assert len(derivations) == 1
+
+        c.environment.scene_luminosity = 1024
+        assert c.exposure_indicator() == "ƒ/8"
+        c.lens_cap.on = True
+        assert c.exposure_indicator() == "Under"
+        c.lens_cap.on = False
+        c.film_speed = 400
+        assert c.exposure_indicator() == "ƒ/16"
+        c.shutter_speed = 1/500
+        assert c.exposure_indicator() == "ƒ/8"
+        c.aperture = 4
+        assert c.exposure_indicator() is None
+        assert pytest.approx(ecs.exposure_value()) == 17
+        assert len(derivations) == 6
+
     def test_new_film_speed_setting_is_applied_to_ecs(self):
         c = Camera()
         assert c.exposure_control_system.film_speed == 100
@@ -292,6 +474,98 @@ class TestExposureControlSystem(object):
         assert c.exposure_control_system.film_speed == 400
 
 
+    def test_luminosity_bounds(self):
+        lower, upper = ExposureControlSystem.luminosity_bounds(100, 1/128)
+        assert pytest.approx(lower) == 1.7 * 1.7 * 16
+        assert pytest.approx(upper) == 4096
+
+
+class TestExposureChart(object):
+
+    def test_chart_covers_every_selectable_combination(self):
+        assert len(exposure_chart) == len(Camera.selectable_film_speeds) * len(Camera.selectable_shutter_speeds)
+
+    def test_chart_agrees_with_meter(self):
+        c = Camera()
+        for (film_speed, shutter_speed), (lower, upper) in exposure_chart.items():
+            c.film_speed = film_speed
+            c.shutter_speed = shutter_speed
+            assert c.exposure_bounds() == (lower, upper)
+
+            c.environment.scene_luminosity = lower * 0.999
+            assert c.exposure_control_system.meter() == "Under"
+            c.environment.scene_luminosity = lower * 1.000000001
+            assert pytest.approx(c.exposure_control_system.meter()) == 1.7
+            c.environment.scene_luminosity = upper * 0.999999999
+            assert pytest.approx(c.exposure_control_system.meter()) == 16
+            c.environment.scene_luminosity = upper * 1.001
+            assert c.exposure_control_system.meter() == "Over"
+
+    def test_chart_agrees_with_shutter_lock(self):
+        c = Camera()
+        lower, upper = c.exposure_bounds()
+        for luminosity in (lower / 2, upper * 2):
+            c.environment.scene_luminosity = luminosity
+            c.exposure_control_system.shutter_lock_lever.deactivate()
+            assert c.exposure_control_system.exposure_bounds_lever.activate() == "Activated shutter lock lever"
+        c.environment.scene_luminosity = (lower + upper) / 2
+        c.exposure_control_system.shutter_lock_lever.deactivate()
+        assert c.exposure_control_system.exposure_bounds_lever.activate() is None
+
+
+class TestCameraSpec(object):
+
+    def test_ql17_spec_file_matches_default_spec(self):
+        spec = CameraSpec.from_file("specs/canonet-g-iii-ql17.json")
+        assert spec.shutter_speeds == ql17.shutter_speeds
+        assert spec.film_speeds == ql17.film_speeds
+        assert spec.exposure_chart == ql17.exposure_chart
+        assert spec.shutter_speed_index[125] == 1/125
+
+    def test_camera_built_to_another_spec(self):
+        c = Camera(spec=CameraSpec.from_file("specs/olympus-35-rc.json"))
+        assert c.exposure_control_system.iris.aperture == 22
+        c.aperture = 22
+        with pytest.raises(c.ApertureOutOfRange):
+            c.aperture = 1.7
+        with pytest.raises(c.NonExistentShutterSpeed, match="1/15, 1/30"):
+            c.shutter_speed = 1/8
+        c.aperture = "A"
+        c.film_advance_lever.wind()
+        assert c.exposure_control_system.iris.aperture == 2.8
+
+    @pytest.mark.parametrize("speed", ["2", "1", "1/1", "3/10"])
+    def test_speeds_that_are_not_fractions_of_a_second_are_refused(self, tmp_path, speed):
+        path = tmp_path / "spec.json"
+        path.write_text(json.dumps({
+            "name": "Slow", "shutter_speeds": {speed: speed, "1/2": "1/2", "1/60": "1/60"},
+            "film_speeds": [100], "apertures": [2.8, 16], "default_shutter_speed": "1/60",
+        }))
+        with pytest.raises(CameraSpec.UnsupportedShutterSpeed):
+            CameraSpec.from_file(path)
+
+    def test_defaults_must_be_settings_of_the_spec(self):
+        with pytest.raises(CameraSpec.InvalidDefault, match="default_shutter_speed"):
+            CameraSpec("X", {1/60: 1/64}, [100], 2.8, 16)
+        with pytest.raises(CameraSpec.InvalidDefault, match="default_film_speed"):
+            CameraSpec("X", {1/60: 1/64}, [200, 400], 2.8, 16, default_shutter_speed=1/60)
+
+    def test_half_a_second(self):
+        spec = CameraSpec("Half", {1/2: 1/2, 1/60: 1/60}, [100], 2.8, 16, default_shutter_speed=1/60)
+        assert spec.shutter_speed_index == {2: 1/2, 60: 1/60}
+        assert spec.shutter_speed_error == "Possible shutter speeds are 1/2, 1/60"
+
+    def test_meter_uses_aperture_range_of_spec(self):
+        c = Camera(spec=CameraSpec.from_file("specs/olympus-35-rc.json"))
+        lower, upper = c.exposure_bounds()
+        c.environment.scene_luminosity = lower * 0.99
+        assert c.exposure_control_system.meter() == "Under"
+        c.environment.scene_luminosity = upper * 0.999999999
+        assert pytest.approx(c.exposure_control_system.meter()) == 22
+        c.environment.scene_luminosity = upper * 1.01
+        assert c.exposure_control_system.meter() == "Over"
+
+
 class TestShutterReleaseLever(object):
 
     def test_nothing_happens_when_there_is_no_exposure_control_system(self):
@@ -353,6 +627,85 @@ class TestShutterReleaseLever(object):
         assert ecs.shutter.cocked == True
 
 
+class TestSpecialisedRoutines(object):
+
+    def test_routines_are_selected_when_the_mode_changes(self):
+        c = Camera()
+        ecs = c.exposure_control_system
+        assert ecs.shutter_release_lever.release.__func__ is ShutterReleaseLever.shutter_priority_release
+        c.aperture = 8
+        assert ecs.shutter_release_lever.release.__func__ is ShutterReleaseLever.manual_release
+        ecs.mode = "Program"
+        assert ecs.shutter_release_lever.release.__func__ is ShutterReleaseLever.release
+        ecs.mode = "Manual"
+        ecs.specialised = False
+        assert ecs.shutter_release_lever.release.__func__ is ShutterReleaseLever.release
+        assert ecs.shutter.apply_aperture.__func__ is Shutter.apply_aperture
+        ecs.specialised = True
+        assert ecs.shutter_release_lever.release.__func__ is ShutterReleaseLever.manual_release
+
+    def test_specialised_routines_match_the_generic_path(self):
+        actions = (
+            ("wind", lambda c: c.film_advance_lever.wind()),
+            ("press", lambda c: c.shutter_button.press()),
+            ("cock", lambda c: c.exposure_control_system.shutter.cock()),
+            ("aperture", lambda c, value: setattr(c, "aperture", value)),
+            ("shutter speed", lambda c, value: setattr(c, "shutter_speed", value)),
+            ("luminosity", lambda c, value: setattr(c.environment, "scene_luminosity", value)),
+            ("open back", lambda c: c.back.open()),
+            ("close back", lambda c: c.back.close()),
+            ("reset", lambda c: c.reset()),
+        )
+        arguments = {
+            "aperture": ["A", "A", 1.7, 2.8, 5.6, 16],
+            "shutter speed": [1/30, 1/125, 1/500],
+            "luminosity": [0, 16, 256, 4096, 16384],
+        }
+        generator = random.Random(42)
+        specialised, generic = Camera(), Camera()
+        generic.exposure_control_system.specialised = False
+        tripped = 0
+
+        def do(camera, action, *values):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                try:
+                    result = action(camera, *values)
+                except Exception as e:
+                    result = type(e)
+            ecs = camera.exposure_control_system
+            return (
+                result, output.getvalue(), camera.snapshot(), ecs.aperture_set_lever.aperture,
+                list(camera.film.exposures), ecs.battery.charge(),
+            )
+
+        for _ in range(1000):
+            name, action = generator.choice(actions)
+            values = [generator.choice(arguments[name])] if name in arguments else []
+            outcome = do(specialised, action, *values)
+            assert outcome == do(generic, action, *values), name
+            tripped += "Shutter closes" in outcome[1]
+        assert tripped > 20
+
+    @pytest.mark.parametrize("duplicate_of", [copy.deepcopy, lambda c: pickle.loads(pickle.dumps(c))])
+    @pytest.mark.parametrize("aperture", ["A", 8])
+    def test_copied_cameras_use_their_own_routines(self, duplicate_of, aperture):
+        c = Camera()
+        c.aperture = aperture
+        c.environment.scene_luminosity = 4096
+        duplicate = duplicate_of(c)
+        ecs = duplicate.exposure_control_system
+        assert ecs.shutter_release_lever.release.__self__ is ecs.shutter_release_lever
+        assert ecs.shutter.apply_aperture.__self__ is ecs.shutter
+
+        duplicate.film_advance_lever.wind()
+        duplicate.shutter_button.press()
+        assert duplicate.film.exposures[0] > 0
+        assert duplicate.frame_counter == 1
+        assert c.film.exposures[0] == 0
+        assert c.frame_counter == 0
+
+
 class TestExposureLevelLever(object):
 
     def test_nothing_happens_when_there_is_no_exposure_control_system(self):
@@ -562,6 +915,36 @@ class TestBack(object):
         assert c.back.open() != "Film is ruined"
         assert c.film.ruined == False
 
+    def test_back_left_open_fogs_film(self):
+        now = [10]
+        c = Camera()
+        c.back.clock = lambda: now[0]
+        c.film.frame = 5
+        c.environment.scene_luminosity = 1024
+        c.back.open()
+        now[0] = 12
+        c.back.close()
+        # the frame in the gate and the one wound off the cassette are fully fogged, the frames on the take-up
+        # spool less so the deeper they lie, and the frames in the cassette not at all
+        fog = 1024 * c.back.leak * 2
+        assert c.film.fog[4] == c.film.fog[5] == fog
+        assert c.film.fog[3] == pytest.approx(fog * c.film.spool_transmission)
+        assert c.film.fog[0] == pytest.approx(fog * c.film.spool_transmission ** 4)
+        assert list(c.film.fog[6:]) == [0] * 18
+        # the longer it is open, the more fog
+        c.back.open()
+        now[0] = 16
+        c.back.close()
+        assert c.film.fog[4] == 3 * fog
+
+    def test_no_fog_without_a_clock(self):
+        c = Camera()
+        c.film.frame = 5
+        c.back.open()
+        c.back.close()
+        assert c.film.ruined == True
+        assert not any(c.film.fog)
+
 
 class TestRegressions(object):
 
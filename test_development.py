@@ -0,0 +1,84 @@
+import pytest
+
+from camera import Camera, Film, Back
+from development import CharacteristicCurve, FILM_PLANE_FACTOR, develop, develop_all, fog_densities
+
+
+class TestCharacteristicCurve(object):
+
+    def test_speed_point(self):
+        curve = CharacteristicCurve.for_speed(100)
+        assert pytest.approx(curve.density(0.008 / FILM_PLANE_FACTOR)) == 0.3
+
+    def test_toe_and_shoulder(self):
+        curve = CharacteristicCurve.for_speed(100)
+        assert curve.density(0) == pytest.approx(0.2)
+        assert curve.density(1e-9) == pytest.approx(0.2)
+        assert curve.density(1e9) == pytest.approx(2.1)
+
+    def test_faster_film_is_denser_for_same_exposure(self):
+        exposure = 0.1
+        assert CharacteristicCurve.for_speed(400).density(exposure) > CharacteristicCurve.for_speed(100).density(exposure)
+
+    def test_density_increases_with_exposure(self):
+        curve = CharacteristicCurve.for_speed(100)
+        densities = curve.densities_of([0.001, 0.01, 0.1, 1, 10])
+        assert list(densities) == sorted(densities)
+
+
+class TestDevelop(object):
+
+    def test_exposed_frames_are_recorded_and_developed(self):
+        c = Camera()
+        for luminosity in (4096, 1024):
+            c.environment.scene_luminosity = luminosity
+            c.film_advance_lever.wind()
+            c.shutter_button.press()
+        assert c.film.exposures[0] == pytest.approx(4096 / 128 / 16 ** 2)
+        assert c.film.exposures[1] == pytest.approx(1024 / 128 / 8 ** 2)
+
+        densities = develop(c.film)
+        assert len(densities) == 24
+        # auto-exposure gives both frames the same density
+        assert densities[0] == pytest.approx(densities[1])
+        assert densities[0] > densities[2] == pytest.approx(0.2)
+
+    def test_lens_cap_leaves_frame_unexposed(self):
+        c = Camera()
+        c.aperture = 8
+        c.lens_cap.on = True
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        assert c.film.exposures[0] == 0
+
+    def test_ruined_film(self):
+        f = Film()
+        f.ruined = True
+        assert list(develop(f)) == [pytest.approx(2.1)] * 24
+
+    def test_fogged_film(self):
+        f = Film()
+        f.frame = 3
+        f.fog_light(0.01)
+        densities = develop(f)
+        # the fogged frames are denser, but not at maximum density
+        assert 0.2 < densities[2] < 2.1
+        assert densities[2] == densities[3] > densities[1] >= densities[0] == pytest.approx(0.2)
+        assert densities[4] == pytest.approx(0.2)
+
+    def test_fog_densities_of_many_openings(self):
+        events = [(3, 4096, 1), (3, 4096, 0), (0, 4096, 60), (24, 16, 10)]
+        densities = fog_densities(events)
+        assert len(densities) == 4 * 24
+        f = Film()
+        f.frame = 3
+        f.fog_light(4096 * Back.leak)
+        assert list(densities[:24]) == pytest.approx([d - 0.2 for d in develop(f)], abs=1e-6)
+        # no time open, or no film wound on, means no fog
+        assert not any(densities[24:72])
+        # with the last frame in the gate, there is nothing beyond it to fog
+        assert densities[95] > 0 and densities[94] < densities[95]
+
+    def test_develop_all(self):
+        films = [Film(speed=speed) for speed in (100, 400)]
+        assert [len(densities) for densities in develop_all(films)] == [24, 24]
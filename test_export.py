@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from camera import Camera
+from export import ResultWriter, read_chunks, write_npy, read_npy
+from array import array
+
+
+def rows(count):
+    for i in range(count):
+        yield (i % 3, i, 1/128, 16, None if i % 5 == 0 else 15.0, 4096, i % 5 == 0, False)
+
+
+@pytest.mark.parametrize("format", ["csv", "npy"])
+class TestRoundTrip(object):
+
+    def test_chunks(self, tmp_path, format):
+        path = tmp_path / "results"
+        with ResultWriter(path, format=format, chunk_rows=4) as writer:
+            for row in rows(10):
+                writer.write(*row)
+            # no more than a chunk is ever held
+            assert len(writer.buffers["camera"]) < 4
+
+        chunks = list(read_chunks(path, format=format, chunk_rows=4))
+        assert [len(chunk["camera"]) for chunk in chunks] == [4, 4, 2]
+        frames = [frame for chunk in chunks for frame in chunk["frame"]]
+        assert frames == list(range(10))
+        ev = [ev for chunk in chunks for ev in chunk["ev"]]
+        assert math.isnan(ev[0]) and ev[1] == 15.0
+        assert [b for chunk in chunks for b in chunk["blocked"]] == [i % 5 == 0 for i in range(10)]
+
+    def test_camera_rows(self, tmp_path, format):
+        c = Camera()
+        path = tmp_path / "results"
+        with ResultWriter(path, format=format) as writer:
+            c.film_advance_lever.wind()
+            c.shutter_button.press()
+            writer.write_camera(7, c, blocked=False)
+        [chunk] = read_chunks(path, format=format)
+        assert chunk["camera"][0] == 7
+        assert chunk["frame"][0] == 1
+        assert chunk["ev"][0] == pytest.approx(15)
+        assert chunk["meter"][0] == 4096
+
+
+class TestFormats(object):
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ResultWriter.UnknownFormat):
+            ResultWriter(tmp_path / "results", format="xls")
+
+    def test_parquet(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        path = tmp_path / "results.parquet"
+        with ResultWriter(path, format="parquet", chunk_rows=4) as writer:
+            for row in rows(10):
+                writer.write(*row)
+        assert [len(chunk["camera"]) for chunk in read_chunks(path, format="parquet", chunk_rows=4)] == [4, 4, 2]
+
+    def test_npy_files_are_aligned_and_readable(self, tmp_path):
+        path = tmp_path / "values.npy"
+        write_npy(path, array("d", [1.5, 2.5]), "<f8")
+        data = path.read_bytes()
+        assert data.startswith(b"\x93NUMPY\x01\x00")
+        assert (len(data) - 16) % 64 == 0
+        assert read_npy(path) == array("d", [1.5, 2.5])
@@ -0,0 +1,91 @@
+import pytest
+
+from camera import Camera
+from fleet import CameraPool, SparseFleet
+
+
+class TestCameraPool(object):
+
+    def test_released_cameras_are_reset_and_reused(self):
+        pool = CameraPool()
+        c = pool.acquire()
+        c.film_advance_lever.wind()
+        c.film_speed = 400
+        pool.release(c)
+        again = pool.acquire()
+        assert again is c
+        assert again.film_speed == 100
+        assert again.exposure_control_system.shutter.cocked == False
+
+    def test_pool_is_bounded(self):
+        pool = CameraPool(size=1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        assert pool.cameras == [first]
+
+    def test_context_manager_returns_camera_to_pool(self):
+        pool = CameraPool()
+        with pool.camera() as c:
+            assert isinstance(c, Camera)
+        assert pool.cameras == [c]
+
+
+class TestSparseFleet(object):
+
+    def test_idle_cameras_cost_nothing(self):
+        fleet = SparseFleet(10_000_000)
+        assert len(fleet) == 10_000_000
+        assert fleet.get(9_999_999, "shutter_speed") == 1/125
+        assert fleet.get(0, "aperture") == "A"
+        assert (fleet.deltas, fleet.cameras) == ({}, {})
+        with pytest.raises(IndexError):
+            fleet.get(10_000_000, "aperture")
+
+    def test_settings_are_kept_as_shared_deltas(self):
+        fleet = SparseFleet(100)
+        fleet.set(1, "film_speed", 400)
+        fleet.set(2, "film_speed", 400)
+        assert fleet.deltas[1] is fleet.deltas[2]
+        assert fleet.get(1, "film_speed") == 400
+        assert fleet.cameras == {}
+        # setting it back to the factory setting leaves nothing to keep
+        fleet.set(2, "film_speed", 100)
+        assert 2 not in fleet.deltas
+
+    def test_illegal_settings_are_refused(self):
+        fleet = SparseFleet(100)
+        with pytest.raises(Camera.NonExistentShutterSpeed):
+            fleet.set(1, "shutter_speed", 1/100)
+        with pytest.raises(Camera.ApertureOutOfRange):
+            fleet.set(1, "aperture", 22)
+        with pytest.raises(Camera.NonExistentFilmSpeed):
+            fleet.set(1, "film_speed", 160)
+        assert fleet.deltas == {}
+
+    def test_cameras_are_real_while_they_differ_from_fresh_ones(self):
+        fleet = SparseFleet(100)
+        fleet.set(3, "aperture", 8)
+        fleet.set(3, "scene_luminosity", 1024)
+        fleet.act(3, lambda camera: camera.film_advance_lever.wind())
+        camera = fleet.cameras[3]
+        assert (camera.aperture, camera.environment.scene_luminosity) == (8, 1024)
+        assert camera.film.frame == 1
+        assert 3 not in fleet.deltas
+
+        # changing a setting of a real camera changes the camera
+        fleet.set(3, "shutter_speed", 1/60)
+        assert camera.shutter_speed == 1/60
+
+        # once it has been reset, only its settings need keeping
+        fleet.act(3, lambda camera: camera.reset())
+        assert fleet.cameras == {}
+        assert 3 not in fleet.deltas
+        assert fleet.pool.cameras == [camera]
+
+    def test_looking_does_not_keep_a_camera_real(self):
+        fleet = SparseFleet(100)
+        fleet.set(4, "aperture", 5.6)
+        assert fleet.act(4, lambda camera: camera.snapshot()["aperture"]) == 5.6
+        assert fleet.cameras == {}
+        assert fleet.deltas[4] == (("aperture", 5.6),)
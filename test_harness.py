@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from camera import Camera, FilmAdvanceMechanism, CameraSpec
+from harness import GoldenTraces, ObjectEngine, reference, generate, trace, FIELDS, OUTCOMES
+from program import Program
+
+
+# an engine that gets one thing wrong: it will wind on without the shutter having been tripped
+class ForgetfulCamera(Camera):
+
+    def __init__(self, spec=None):
+        super().__init__(spec=spec)
+        self.film_advance_mechanism.__class__ = ForgetfulAdvanceMechanism
+
+
+class ForgetfulAdvanceMechanism(FilmAdvanceMechanism):
+
+    def advance(self):
+        self.advanced = False
+        return super().advance()
+
+
+class TestTraces(object):
+
+    def test_programs_are_repeatable_and_legal(self):
+        assert list(generate(1, 5).code) == list(generate(1, 5).code)
+        assert list(generate(1, 5).code) != list(generate(1, 6).code)
+        generate(1, 5).validate(Camera().spec)
+
+    def test_trace_has_a_row_per_instruction(self):
+        program = generate(0, 0, length=10)
+        rows = trace(Camera(), program)
+        assert len(rows) == 10 * len(FIELDS)
+        assert rows == reference(program, Camera().spec)
+
+    def test_only_presses_stopped_by_the_shutter_lock_are_blocked(self):
+        program = Program.assemble([("PRESS",), ("SET_LUMINOSITY", 16), ("WIND",), ("PRESS",)])
+        rows = trace(Camera(), program)
+        assert [OUTCOMES[int(rows[i * len(FIELDS)])] for i in range(4)] == ["done", "done", "done", "blocked"]
+
+
+class TestGoldenTraces(object):
+
+    def test_reference_agrees_with_itself(self):
+        traces = GoldenTraces(seed=3, length=32, chunk_size=25).record(100)
+        assert len(traces) == 100
+        assert traces.replay(reference) is None
+
+    def test_recording_in_parallel(self):
+        traces = GoldenTraces(seed=3, length=32, chunk_size=25).record(100)
+        assert GoldenTraces(seed=3, length=32, chunk_size=25).record(100, workers=2).digests == traces.digests
+        assert traces.replay(reference, workers=2) is None
+
+    def test_first_divergence_is_reported(self):
+        traces = GoldenTraces(seed=3, length=32, chunk_size=25).record(100)
+        divergence = traces.replay(ObjectEngine(ForgetfulCamera))
+        assert divergence.instruction == "WIND"
+        assert divergence.field == "outcome"
+        assert divergence.expected == "AlreadyAdvanced"
+        assert divergence.actual == "AlreadyCocked"
+        # no earlier program diverges
+        for index in range(divergence.index):
+            program = generate(3, index, 32)
+            assert ObjectEngine(ForgetfulCamera)(program, Camera().spec) == reference(program, Camera().spec)
+
+    def test_stale_golden_traces_are_not_agreement(self):
+        traces = GoldenTraces(seed=3, length=32, chunk_size=25).record(100)
+        traces.digests = traces.digests[:16 * 30] + bytes(16) + traces.digests[16 * 31:]
+        with pytest.raises(GoldenTraces.Stale, match="programs 30 "):
+            traces.replay(reference)
+        with pytest.raises(GoldenTraces.Stale):
+            traces.replay(reference, workers=2)
+
+    def test_traces_recorded_with_another_model_are_stale(self, tmp_path):
+        traces = GoldenTraces(seed=3, length=16).record(20)
+        traces.save(tmp_path / "golden")
+        data = (tmp_path / "golden").read_bytes()
+        header, digests = data.split(b"\n", 1)
+        header = json.loads(header)
+        header["model"] = "0" * 64
+        (tmp_path / "golden").write_bytes(json.dumps(header).encode() + b"\n" + digests)
+        with pytest.raises(GoldenTraces.Stale):
+            GoldenTraces.load(tmp_path / "golden")
+
+    def test_save_and_load(self, tmp_path):
+        traces = GoldenTraces(seed=3, length=16).record(20)
+        traces.save(tmp_path / "golden")
+        loaded = GoldenTraces.load(tmp_path / "golden")
+        assert (loaded.seed, loaded.length, loaded.digests) == (3, 16, traces.digests)
+        with pytest.raises(GoldenTraces.WrongSpecification):
+            GoldenTraces.load(tmp_path / "golden", spec=CameraSpec.from_file("specs/olympus-35-rc.json"))
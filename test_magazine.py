@@ -0,0 +1,63 @@
+import pytest
+
+from camera import Camera, Film
+from development import develop
+from magazine import Magazine
+
+
+def shoot(frames):
+    def shoot(camera):
+        for _ in range(frames):
+            camera.film_advance_lever.wind()
+            camera.shutter_button.press()
+    return shoot
+
+
+class TestMagazine(object):
+
+    def test_rolls_are_streamed_and_recycled(self):
+        rolls, films = [], set()
+
+        def consumer(film):
+            films.add(id(film))
+            rolls.append((film.fully_rewound, film.ruined, list(develop(film))))
+
+        with Magazine(Camera(), consumer) as magazine:
+            magazine.run(magazine.stock(6, speed=400), shoot(2))
+
+        assert len(rolls) == 6
+        # every roll was rewound before the back was opened, and so wasn't ruined
+        assert all(rewound and not ruined for rewound, ruined, _ in rolls)
+        densities = [d for _, _, d in rolls]
+        assert all(d[0] > d[2] for d in densities)
+        assert densities[0] == densities[5]
+        # only two rolls' buffers were ever used
+        assert len(films) == 2
+
+    def test_reloading(self):
+        c = Camera()
+        magazine = Magazine(c, consumer=lambda film: None)
+        film = Film()
+        magazine.load(film)
+        assert c.film is film and film.camera is c
+        shoot(3)(c)
+        assert c.frame_counter == 3
+        magazine.load(Film())
+        assert c.frame_counter == 0
+        assert c.back.closed == True
+        assert (film.frame, film.fully_rewound, film.ruined) == (0, True, False)
+        magazine.close()
+        assert c.film is not film
+
+    def test_consumer_errors_are_raised_on_close(self):
+        def consumer(film):
+            raise ValueError("Developer exhausted")
+
+        magazine = Magazine(Camera(), consumer)
+        magazine.run(magazine.stock(3), shoot(1))
+        with pytest.raises(ValueError, match="exhausted"):
+            magazine.close()
+
+    def test_too_few_buffers(self):
+        with pytest.raises(Magazine.TooFewBuffers):
+            Magazine(Camera(), consumer=print, buffers=1)
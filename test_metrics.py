@@ -0,0 +1,108 @@
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import metrics
+from camera import Camera, Shutter
+from metrics import Metrics
+
+
+@pytest.fixture
+def registry():
+    yield metrics.install()
+    metrics.uninstall()
+
+
+def shoot_roll(frames):
+    registry = metrics.install()
+    c = Camera()
+    c.exposure_control_system.shutter.timed = False
+    for _ in range(frames):
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        c.exposure_control_system.shutter.close()
+    metrics.uninstall()
+    return registry.snapshot()
+
+
+class TestInstrumentation(object):
+
+    def test_frames_exposed_and_latency(self, registry):
+        c = Camera()
+        for _ in range(3):
+            c.film_advance_lever.wind()
+            c.shutter_button.press()
+        assert registry.frames_exposed == 3
+        assert sum(registry.latency_counts) == 3
+        assert registry.latency_sum > 0
+
+    def test_blocked_releases_and_readings(self, registry):
+        c = Camera()
+        c.environment.scene_luminosity = 16384
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        c.environment.scene_luminosity = 16
+        c.shutter_button.press()
+        assert registry.frames_exposed == 0
+        assert registry.releases_blocked == 2
+        assert registry.blocked_readings == {"Over": 1, "Under": 1}
+
+    def test_ruined_films_and_refusals(self, registry):
+        c = Camera()
+        c.film = c.film.__class__(frames=1, camera=c)
+        c.film_advance_lever.wind()
+        with pytest.raises(c.film_advance_mechanism.AlreadyAdvanced):
+            c.film_advance_lever.wind()
+        with pytest.raises(Shutter.AlreadyCocked):
+            c.exposure_control_system.shutter.cock()
+        c.shutter_button.press()
+        with pytest.raises(c.film.NoMoreFrames):
+            c.film_advance_lever.wind()
+        c.back.open()
+        assert registry.films_ruined == 1
+        assert registry.refusals == {"AlreadyAdvanced": 1, "AlreadyCocked": 1, "NoMoreFrames": 1}
+
+    def test_uninstall_restores_mechanism(self):
+        original = Shutter.close
+        metrics.install()
+        assert Shutter.close is not original
+        metrics.uninstall()
+        assert Shutter.close is original
+        assert metrics.registry is None
+
+
+class TestMetrics(object):
+
+    def test_merge_across_processes(self):
+        total = Metrics()
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            for snapshot in executor.map(shoot_roll, [2, 3]):
+                total.merge(snapshot)
+        assert total.frames_exposed == 5
+        assert sum(total.latency_counts) == 5
+
+    def test_exposition(self):
+        m = Metrics()
+        m.frames_exposed = 4
+        m.refusals = {"NoMoreFrames": 2}
+        m.observe_latency(0.002)
+        text = m.exposition()
+        assert "camera_frames_exposed_total 4\n" in text
+        assert 'camera_refusals_total{exception="NoMoreFrames"} 2\n' in text
+        assert 'camera_press_seconds_bucket{le="0.001"} 0\n' in text
+        assert 'camera_press_seconds_bucket{le="0.005"} 1\n' in text
+        assert 'camera_press_seconds_bucket{le="+Inf"} 1\n' in text
+        assert "camera_press_seconds_count 1\n" in text
+
+    def test_endpoint(self):
+        m = Metrics()
+        m.frames_exposed = 7
+        server = metrics.serve(m, port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                assert "camera_frames_exposed_total 7" in response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,141 @@
+import queue, threading
+
+import pytest
+
+import metrics, monitor
+from camera import Camera, Shutter
+from monitor import Subscription, FIELDS
+
+
+@pytest.fixture
+def stream():
+    yield monitor.install()
+    monitor.uninstall()
+
+
+class TestChangeStream(object):
+
+    def test_initial_state_then_changes(self, stream):
+        c = Camera()
+        stream.watch(c, "c1")
+        subscription = stream.subscribe()
+        name, fields = subscription.get(block=False)
+        assert name == "c1" and set(fields) == set(FIELDS)
+
+        c.film_advance_lever.wind()
+        assert subscription.drain() == [
+            ("c1", {"frame_counter": 1, "cocked": True, "advanced": True, "iris_aperture": 1.7, "film_frame": 1})
+        ]
+
+    def test_changes_are_coalesced_per_action(self, stream):
+        c = Camera()
+        stream.watch(c, "c1")
+        subscription = stream.subscribe(initial=False)
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        messages = subscription.drain()
+        # one message for the wind, one for the press (not one for every part of the mechanism that moved)
+        assert len(messages) == 2
+        assert messages[1] == ("c1", {"cocked": False, "advanced": False, "iris_aperture": 16})
+
+    def test_nothing_is_sent_when_nothing_changes(self, stream):
+        c = Camera()
+        stream.watch(c)
+        subscription = stream.subscribe(initial=False)
+        c.back.close()
+        c.shutter_speed = 1/125
+        assert subscription.drain() == []
+
+    def test_settings_and_other_changes(self, stream):
+        c = Camera()
+        stream.watch(c, "c1")
+        subscription = stream.subscribe(initial=False)
+        c.film_speed = 400
+        assert subscription.drain() == [("c1", {"exposure_indicator": "Over"})]
+        # a change made directly to the camera is reported when the stream is asked to check it
+        c.environment.scene_luminosity = 1024
+        assert subscription.drain() == []
+        stream.check(c)
+        assert subscription.drain() == [("c1", {"exposure_indicator": "ƒ/16"})]
+
+    def test_unwatched_cameras_and_uninstalling(self, stream):
+        c = Camera()
+        subscription = stream.subscribe(initial=False)
+        c.film_advance_lever.wind()
+        assert subscription.drain() == []
+        original = metrics.wrapped[(Shutter, "close")][0]
+        monitor.uninstall()
+        assert Shutter.close is original
+
+    def test_untimed_shutter_closing_is_an_action(self, stream):
+        c = Camera()
+        c.exposure_control_system.shutter.timed = False
+        stream.watch(c, "c1")
+        subscription = stream.subscribe(initial=False)
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        subscription.drain()
+        c.exposure_control_system.shutter.close()
+        assert subscription.drain() == [("c1", {"cocked": False, "advanced": False})]
+
+
+    @pytest.mark.parametrize("first, second", [(metrics, monitor), (monitor, metrics)])
+    def test_installed_alongside_metrics(self, first, second):
+        original = Shutter.close, Camera.aperture
+        try:
+            first.install()
+            second.install()
+            # uninstalling one leaves the other working, and it can be installed again on top
+            first.uninstall()
+            first.install()
+
+            registry, stream = metrics.registry, monitor.stream
+            c = Camera()
+            c.exposure_control_system.shutter.timed = False
+            stream.watch(c, "c1")
+            subscription = stream.subscribe(initial=False)
+            c.film_advance_lever.wind()
+            c.shutter_button.press()
+            c.exposure_control_system.shutter.close()
+            c.aperture = 8
+            assert registry.frames_exposed == 1
+            assert [changes for _, changes in subscription.drain()][-2:] == [
+                {"cocked": False, "advanced": False}, {"exposure_indicator": None}
+            ]
+
+            monitor.uninstall()
+            c.film_advance_lever.wind()
+            c.shutter_button.press()
+            c.exposure_control_system.shutter.close()
+            assert registry.frames_exposed == 2
+            assert subscription.drain() == []
+        finally:
+            metrics.uninstall()
+            monitor.uninstall()
+        assert (Shutter.close, Camera.aperture) == original
+        assert metrics.wrapped == {}
+
+
+class TestSubscription(object):
+
+    def test_a_full_queue_merges_changes(self):
+        subscription = Subscription(size=2)
+        subscription.put("a", {"frame_counter": 1})
+        subscription.put("b", {"frame_counter": 1})
+        subscription.put("a", {"frame_counter": 2, "cocked": True})
+        subscription.put("a", {"frame_counter": 3})
+        subscription.put("b", {"cocked": True})
+        assert subscription.queue.qsize() == 2
+        assert subscription.drain() == [
+            ("a", {"frame_counter": 1}),
+            ("b", {"frame_counter": 1}),
+            ("a", {"frame_counter": 3, "cocked": True}),
+            ("b", {"cocked": True}),
+        ]
+
+    def test_waiting_for_changes(self):
+        subscription = Subscription()
+        with pytest.raises(queue.Empty):
+            subscription.get(timeout=0.01)
+        threading.Timer(0.01, subscription.put, ["a", {"cocked": True}]).start()
+        assert subscription.get(timeout=1) == ("a", {"cocked": True})
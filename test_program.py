@@ -0,0 +1,69 @@
+import pytest
+
+from camera import Camera, CameraSpec
+from program import Program, run, WIND, PRESS
+
+
+class TestProgram(object):
+
+    def test_assemble(self):
+        program = Program.assemble([("SET_SHUTTER", 250), ("SET_APERTURE", "A"), ("WIND",), ("PRESS",)])
+        assert len(program) == 4
+        assert list(program.code) == [1, 250, 2, 0, WIND, 0, PRESS, 0]
+
+    def test_unknown_instruction(self):
+        with pytest.raises(Program.UnknownInstruction):
+            Program.assemble([("FOCUS", 3)])
+        with pytest.raises(Program.UnknownInstruction):
+            Program([99, 0]).validate(Camera().spec)
+
+    def test_illegal_settings_are_rejected_before_running(self):
+        for instruction, exception in (
+            (("SET_SHUTTER", 100), Camera.NonExistentShutterSpeed),
+            (("SET_APERTURE", 22), Camera.ApertureOutOfRange),
+            (("SET_FILM_SPEED", 160), Camera.NonExistentFilmSpeed),
+        ):
+            c = Camera()
+            program = Program.assemble([("WIND",), ("PRESS",), instruction])
+            with pytest.raises(exception, match="Instruction 2"):
+                run(program, c)
+            assert c.frame_counter == 0
+
+    def test_settings_are_validated_against_camera_model(self):
+        c = Camera(spec=CameraSpec.from_file("specs/olympus-35-rc.json"))
+        with pytest.raises(Camera.ApertureOutOfRange):
+            run(Program.assemble([("SET_APERTURE", 2)]), c)
+
+
+class TestRun(object):
+
+    def test_scripted_shoot(self):
+        c = Camera()
+        program = Program.assemble(
+            [("SET_FILM_SPEED", 50), ("SET_SHUTTER", 250)]
+            + [("WIND",), ("PRESS",)] * 3
+            + [("SET_LUMINOSITY", 16384), ("SET_APERTURE", 16), ("WIND",), ("PRESS",)]
+            + [("SET_APERTURE", "A"), ("CAP_ON",), ("CAP_OFF",), ("REWIND",), ("OPEN_BACK",), ("CLOSE_BACK",)]
+        )
+        assert run(program, c) == (4, 0)
+        assert c.film_speed == 50
+        assert c.shutter_speed == 1/250
+        assert c.aperture == "A"
+        assert c.film.fully_rewound == True
+        assert c.film.ruined == False
+        assert c.back.closed == True
+        assert c.exposure_control_system.shutter.timed == True
+
+    def test_blocked_presses_are_counted(self):
+        c = Camera()
+        program = Program.assemble([("SET_LUMINOSITY", 16), ("WIND",), ("PRESS",), ("PRESS",)])
+        assert run(program, c) == (0, 2)
+
+    def test_presses_of_an_uncocked_shutter_are_not_blocked(self):
+        assert run(Program.assemble([("PRESS",)]), Camera()) == (0, 0)
+
+    def test_mechanism_exceptions_still_propagate(self):
+        c = Camera()
+        with pytest.raises(c.film_advance_mechanism.AlreadyAdvanced):
+            run(Program.assemble([("WIND",), ("WIND",)]), c)
+        assert c.exposure_control_system.shutter.timed == True
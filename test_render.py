@@ -0,0 +1,64 @@
+import pytest
+
+from camera import Camera
+from development import curve_for
+from render import RenderedRoll
+
+
+class TestRenderedRoll(object):
+
+    def test_uniform_scene(self, tmp_path):
+        with RenderedRoll(tmp_path / "roll", frames=2, width=4, height=3) as roll:
+            roll.expose(1, 4096, aperture=16, timer=1/128, film_speed=100)
+            frame = roll[1]
+            assert frame.shape == (3, 4)
+            assert frame[2, 3] == pytest.approx(curve_for(100).density(4096 / 128 / 256))
+            assert roll[0][0, 0] == 0
+            frame.release()
+
+    def test_luminance_map(self, tmp_path):
+        luminance = [[0, 1024], [4096, 16384]]
+        with RenderedRoll(tmp_path / "roll", frames=1, width=2, height=2) as roll:
+            roll.expose(0, luminance, aperture=8, timer=1/128, film_speed=100)
+            frame = roll[0]
+            assert frame[0, 0] == pytest.approx(0.2)
+            assert frame[0, 0] < frame[0, 1] < frame[1, 0] < frame[1, 1]
+            frame.release()
+
+    def test_wrong_size_luminance_map(self, tmp_path):
+        with RenderedRoll(tmp_path / "roll", frames=1, width=2, height=2) as roll:
+            with pytest.raises(RenderedRoll.WrongSize):
+                roll.expose(0, [[1, 2, 3], [1, 2, 3]], aperture=8, timer=1/128, film_speed=100)
+
+    def test_roll_is_on_disk_and_can_be_reopened(self, tmp_path):
+        path = tmp_path / "roll"
+        with RenderedRoll(path, frames=3, width=4, height=4) as roll:
+            roll.expose(2, 1024, aperture=8, timer=1/128, film_speed=400)
+        assert path.stat().st_size == 3 * 4 * 4 * 4
+
+        with RenderedRoll(path, frames=3, width=4, height=4, readonly=True) as roll:
+            frame = roll[2]
+            assert frame[0, 0] == pytest.approx(curve_for(400).density(1024 / 128 / 64))
+            assert frame.readonly
+            frame.release()
+
+    def test_capture_from_camera(self, tmp_path):
+        c = Camera()
+        c.film_advance_lever.wind()
+        c.shutter_button.press()
+        with RenderedRoll(tmp_path / "roll", frames=24, width=2, height=2) as roll:
+            roll.capture(c)
+            frame = roll[0]
+            assert frame[1, 1] == pytest.approx(curve_for(100).density(c.film.exposures[0]))
+            frame.release()
+
+    def test_no_such_frame(self, tmp_path):
+        with RenderedRoll(tmp_path / "roll", frames=1, width=2, height=2) as roll:
+            with pytest.raises(IndexError):
+                roll[1]
+            for frame in (-1, 1):
+                with pytest.raises(IndexError):
+                    roll.expose(frame, 1024, 8, 1/125, 100)
+            # a camera that has not exposed a frame has nothing to capture
+            with pytest.raises(IndexError):
+                roll.capture(Camera())
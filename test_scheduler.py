@@ -0,0 +1,138 @@
+import pytest
+
+from camera import Camera, FilmAdvanceMechanism
+from scheduler import Scheduler
+
+
+class TestScheduler(object):
+
+    def test_press_leaves_shutter_open_until_its_timer_has_run(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        s.schedule(0, c, "wind")
+        s.schedule(0, c, "press")
+        s.run(until=0)
+        assert c.exposure_control_system.shutter.closed == False
+        assert c.exposure_control_system.shutter.cocked == True
+        s.run()
+        assert s.now == 1/128
+        assert c.exposure_control_system.shutter.closed == True
+        assert c.exposure_control_system.shutter.cocked == False
+        assert c.film_advance_mechanism.advanced == False
+
+    def test_film_cannot_be_wound_while_shutter_is_open(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        c.shutter_speed = 1/4
+        c.environment.scene_luminosity = 64
+        s.schedule(0, c, "wind")
+        s.schedule(0, c, "press")
+        s.schedule(0.1, c, "wind")
+        s.schedule(0.3, c, "wind")
+        s.run()
+        assert len(s.refusals) == 1
+        time, camera, action, exception = s.refusals[0]
+        assert (time, camera, action) == (0.1, c, "wind")
+        assert isinstance(exception, FilmAdvanceMechanism.AlreadyAdvanced)
+        assert c.frame_counter == 2
+
+    def test_events_are_processed_in_time_order(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        s.schedule(2, c, "luminosity", 32)
+        s.schedule(1, c, "luminosity", 1024)
+        s.run(until=1)
+        assert c.environment.scene_luminosity == 1024
+        s.run()
+        assert c.environment.scene_luminosity == 32
+
+    def test_burst(self):
+        s = Scheduler()
+        cameras = [s.add(Camera()) for _ in range(3)]
+        for i, c in enumerate(cameras):
+            s.burst(c, start=i, frames=5, interval=0.5)
+        s.run()
+        assert [c.frame_counter for c in cameras] == [5, 5, 5]
+        assert not s.refusals
+
+    def test_locked_shutter_is_not_closed_later(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        s.schedule(0, c, "luminosity", 16384)
+        s.burst(c, start=1, frames=1, interval=1)
+        s.run()
+        assert c.exposure_control_system.shutter.cocked == True
+        assert s.processed == 3
+
+    def test_back_and_rewind(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        s.burst(c, start=0, frames=2, interval=1)
+        s.schedule(5, c, "rewind")
+        s.schedule(6, c, "open back")
+        s.schedule(7, c, "close back")
+        s.run()
+        assert c.film.fully_rewound == True
+        assert c.film.ruined == False
+        assert c.back.closed == True
+
+    def test_back_open_on_the_simulated_clock_fogs_film(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        s.burst(c, start=0, frames=2, interval=1)
+        s.schedule(5, c, "open back")
+        s.schedule(8, c, "close back")
+        s.run()
+        assert c.film.ruined == True
+        assert c.film.fog[1] == 4096 * c.back.leak * 3
+
+    def test_pressing_while_the_shutter_is_open_does_not_cut_short_the_next_exposure(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        c.shutter_speed = 1/4
+        s.schedule(0, c, "luminosity", 64)
+        s.schedule(0, c, "wind")
+        s.schedule(0, c, "press")
+        s.schedule(0.1, c, "press")
+        s.schedule(0.26, c, "wind")
+        s.schedule(0.3, c, "press")
+        s.run(until=0.4)
+        assert c.exposure_control_system.shutter.closed == False
+        s.run(until=0.54)
+        assert c.exposure_control_system.shutter.closed == False
+        s.run()
+        assert c.exposure_control_system.shutter.closed == True
+        assert s.now == pytest.approx(0.55)
+
+    def test_meter_cuts_out_after_simulated_idle_time(self):
+        s = Scheduler()
+        s.run(until=1000)
+        c = s.add(Camera())
+        battery = c.exposure_control_system.battery
+        battery.idle_drain = 0.01
+        assert battery.charge() == battery.capacity
+        cutoff = battery.time_of_cutoff()
+
+        s.schedule(1000, c, "luminosity", 4096)
+        s.burst(c, 1000, 1, 1)
+        s.burst(c, cutoff - 1, 1, 1)
+        s.burst(c, cutoff + 1, 1, 1)
+        s.run()
+        assert c.film.exposures[0] > 0
+        assert c.film.exposures[1] > 0
+        assert c.film.exposures[2] == 0
+        assert not battery
+
+    def test_cannot_schedule_in_the_past(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        s.run(until=10)
+        with pytest.raises(Scheduler.InThePast):
+            s.schedule(5, c, "wind")
+
+    def test_unknown_actions_cannot_be_scheduled(self):
+        s = Scheduler()
+        c = s.add(Camera())
+        with pytest.raises(Scheduler.UnknownAction):
+            s.schedule(1, c, "wnid")
+        assert s.queue == []
@@ -0,0 +1,114 @@
+import json, asyncio
+
+import pytest
+
+from server import CameraServer, CameraClient
+
+
+class TestCameraServer(object):
+
+    def test_batch(self):
+        server = CameraServer()
+        results = server.run([
+            {"command": "create"},
+            {"command": "set", "camera": 1, "shutter_speed": "1/250", "film_speed": 50},
+            {"command": "wind", "camera": 1},
+            {"command": "press", "camera": 1},
+            {"command": "state", "camera": 1},
+        ])
+        assert results[0] == {"result": 1}
+        assert results[3] == {"result": "Tripped"}
+        state = results[4]["result"]
+        assert state["shutter_speed"] == 1/250
+        assert state["film_speed"] == 50
+        assert state["frame_counter"] == 1
+        assert state["cocked"] == False
+
+    def test_refused_commands_do_not_stop_batch(self):
+        server = CameraServer()
+        results = server.run([
+            {"command": "create"},
+            {"command": "wind", "camera": 1},
+            {"command": "wind", "camera": 1},
+            {"command": "set", "camera": 1, "aperture": 22},
+            {"command": "set", "camera": 1, "colour": "red"},
+            {"command": "wind", "camera": 2},
+            {"command": "focus", "camera": 1},
+            {"command": "state", "camera": 1},
+        ])
+        assert [result.get("error") for result in results] == [
+            None, None, "AlreadyAdvanced", "ApertureOutOfRange", "UnknownSetting", "KeyError", "KeyError", None
+        ]
+        assert results[-1]["result"]["frame_counter"] == 1
+
+    def test_malformed_shutter_speeds_are_refused_one_command_at_a_time(self):
+        server = CameraServer()
+        results = server.run([
+            {"command": "create"},
+            {"command": "set", "camera": 1, "shutter_speed": "fast"},
+            {"command": "set", "camera": 1, "shutter_speed": "1/"},
+            {"command": "set", "camera": 1, "shutter_speed": "1/250"},
+            {"command": "state", "camera": 1},
+        ])
+        assert [result.get("error") for result in results] == [
+            None, "NonExistentShutterSpeed", "NonExistentShutterSpeed", None, None
+        ]
+        assert results[-1]["result"]["shutter_speed"] == 1/250
+
+    def test_blocked_press(self):
+        server = CameraServer()
+        results = server.run([
+            {"command": "create"},
+            {"command": "set", "camera": 1, "scene_luminosity": 16384},
+            {"command": "wind", "camera": 1},
+            {"command": "press", "camera": 1},
+        ])
+        assert results[3] == {"result": None}
+
+    def test_over_a_socket(self, tmp_path):
+        async def session():
+            server = await CameraServer().start(path=str(tmp_path / "socket"))
+            async with server:
+                client = await CameraClient.connect(path=str(tmp_path / "socket"))
+                [created] = await client.call([{"command": "create"}])
+                camera = created["result"]
+                results = await client.call([{"command": "wind", "camera": camera}, {"command": "press", "camera": camera}])
+                with pytest.raises(CameraClient.BadRequest):
+                    client.writer.write(b"not json\n")
+                    await client.call([])
+                await client.close()
+            return results
+
+        assert asyncio.run(session()) == [{"result": None}, {"result": "Tripped"}]
+
+    def test_batches_larger_than_asyncio_default_limit(self, tmp_path):
+        async def session():
+            server = await CameraServer().start(path=str(tmp_path / "socket"))
+            async with server:
+                client = await CameraClient.connect(path=str(tmp_path / "socket"))
+                await client.call([{"command": "create"}])
+                results = await client.call([{"command": "state", "camera": 1}] * 3000)
+                await client.close()
+            return results
+
+        results = asyncio.run(session())
+        assert len(results) == 3000
+        assert results[-1]["result"]["frame_counter"] == 0
+
+    def test_bad_and_oversized_requests_do_not_drop_the_connection(self, tmp_path):
+        async def session():
+            server = await CameraServer(limit=1024).start(path=str(tmp_path / "socket"))
+            async with server:
+                client = await CameraClient.connect(path=str(tmp_path / "socket"))
+                responses = []
+                for line in (b'{"commands": 5}', b'{"commands": ["create"]}', b" " * 5000 + b"[]"):
+                    client.writer.write(line + b"\n")
+                    responses.append(json.loads(await client.reader.readline()))
+                results = await client.call([{"command": "create"}])
+                await client.close()
+            return responses, results
+
+        responses, results = asyncio.run(session())
+        assert [response["error"] for response in responses] == ["BadRequest"] * 3
+        assert responses[2]["message"] == "Requests are limited to 1024 bytes"
+        assert results == [{"result": 1}]
@@ -0,0 +1,65 @@
+import pytest
+
+from tolerance import Tolerances, ToleranceAnalysis, ExposureErrors, simulate_chunk
+
+
+class TestToleranceAnalysis(object):
+
+    def test_exact_camera_has_no_exposure_error(self):
+        analysis = ToleranceAnalysis(Tolerances(), settings=[(100, 1/125, 1024)])
+        errors = analysis.run(1000)[(100, 1/125, 1024)]
+        assert errors.count == 1000
+        assert errors.blocked == 0
+        assert pytest.approx(errors.mean(), abs=1e-9) == 0
+        assert pytest.approx(errors.stdev(), abs=1e-6) == 0
+
+    def test_out_of_range_scene_is_blocked(self):
+        analysis = ToleranceAnalysis(Tolerances(), settings=[(100, 1/125, 16384)])
+        errors = analysis.run(100)[(100, 1/125, 16384)]
+        assert errors.blocked == 100
+        assert errors.count == 0
+        assert errors.mean() is None
+
+    def test_shutter_error_spreads_exposure(self):
+        analysis = ToleranceAnalysis(Tolerances(shutter=0.3), settings=[(100, 1/125, 1024)])
+        errors = analysis.run(20000)[(100, 1/125, 1024)]
+        assert pytest.approx(errors.mean(), abs=0.02) == 0
+        assert pytest.approx(errors.stdev(), abs=0.02) == 0.3
+        assert errors.quantile(0.1) < 0 < errors.quantile(0.9)
+
+    def test_meter_error_is_compensated_within_bounds(self):
+        # the meter error is applied by the aperture, so the exposure error follows it
+        analysis = ToleranceAnalysis(Tolerances(meter=0.5), settings=[(100, 1/125, 1024)])
+        errors = analysis.run(20000)[(100, 1/125, 1024)]
+        assert pytest.approx(errors.stdev(), abs=0.02) == 0.5
+
+    def test_results_do_not_depend_on_chunking_of_workers(self):
+        settings = [(100, 1/125, 1024), (400, 1/30, 64)]
+        tolerances = Tolerances(shutter=0.2, iris=0.1, meter=0.3, battery_sag=0.05)
+        serial = ToleranceAnalysis(tolerances, settings, seed=7, chunk_size=500).run(2000)
+        parallel = ToleranceAnalysis(tolerances, settings, seed=7, chunk_size=500).run(2000, workers=2)
+        for setting in settings:
+            assert serial[setting].histogram == parallel[setting].histogram
+            assert serial[setting].blocked == parallel[setting].blocked
+
+    def test_seeds_give_independent_streams(self):
+        tolerances = Tolerances(shutter=0.2)
+        _, first = simulate_chunk(tolerances, (100, 1/125, 1024), 100, seed=1, chunk=0)
+        _, second = simulate_chunk(tolerances, (100, 1/125, 1024), 100, seed=1, chunk=1)
+        assert first.histogram != second.histogram
+
+
+class TestExposureErrors(object):
+
+    def test_merge(self):
+        first = ExposureErrors()
+        first.histogram = {0: 2, 1: 1}
+        first.count = 3
+        second = ExposureErrors()
+        second.histogram = {1: 1}
+        second.count = 1
+        second.blocked = 4
+        first.merge(second)
+        assert first.histogram == {0: 2, 1: 2}
+        assert first.count == 4
+        assert first.blocked == 4
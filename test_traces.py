@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from camera import Camera
+from scheduler import Scheduler
+from traces import LuminosityTrace, TraceEnvironment
+
+
+def meter_readings(handle, times):
+    trace = LuminosityTrace.attach(handle)
+    c = Camera()
+    c.environment = TraceEnvironment(trace)
+    readings = []
+    for time in times:
+        c.environment.time = time
+        readings.append(c.exposure_control_system.light_meter.reading())
+    trace.close()
+    return readings
+
+
+class TestLuminosityTrace(object):
+
+    def test_sampling(self):
+        trace = LuminosityTrace.in_shared_memory([1, 2, 3], interval=10)
+        try:
+            assert len(trace) == 3
+            assert [trace.at(t) for t in (-5, 0, 9, 10, 25, 1000)] == [1, 1, 1, 2, 3, 3]
+            assert trace.samples.readonly
+        finally:
+            trace.unlink()
+
+    def test_workers_share_memory_trace(self):
+        trace = LuminosityTrace.in_shared_memory([4096, 1024, 256], interval=60)
+        try:
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(meter_readings, [trace.handle] * 2, [[0, 60], [120, 60]]))
+            assert results == [[4096, 1024], [256, 1024]]
+            assert trace.at(0) == 4096
+        finally:
+            trace.unlink()
+
+    def test_workers_share_file_trace(self, tmp_path):
+        trace = LuminosityTrace.in_file(tmp_path / "trace", [4096, 1024], interval=60)
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(meter_readings, trace.handle, [0, 60]).result() == [4096, 1024]
+        trace.unlink()
+        assert not (tmp_path / "trace").exists()
+
+
+class TestTraceEnvironment(object):
+
+    def test_environment_follows_scheduler_clock(self):
+        trace = LuminosityTrace.in_shared_memory([4096, 32], interval=1)
+        try:
+            s = Scheduler()
+            c = s.add(Camera())
+            c.environment = TraceEnvironment(trace, clock=lambda: s.now)
+            s.burst(c, start=0, frames=2, interval=1)
+            s.run()
+            # the second frame is too dark, and the shutter is locked
+            assert c.frame_counter == 2
+            assert c.exposure_control_system.shutter.cocked == True
+        finally:
+            trace.unlink()
+
+    def test_camera_reset_rewinds_trace_environment(self):
+        trace = LuminosityTrace.in_shared_memory([4096, 32], interval=1)
+        try:
+            c = Camera()
+            c.environment = TraceEnvironment(trace, time=5)
+            c.reset()
+            assert c.environment.scene_luminosity == 4096
+        finally:
+            trace.unlink()
+
+    def test_scheduled_luminosity_change_is_refused(self):
+        trace = LuminosityTrace.in_shared_memory([4096, 32], interval=1)
+        try:
+            s = Scheduler()
+            c = s.add(Camera())
+            c.environment = TraceEnvironment(trace, clock=s.clock)
+            s.schedule(0, c, "luminosity", 32)
+            s.burst(c, start=0, frames=1, interval=1)
+            s.run()
+            assert [(time, action) for time, _, action, _ in s.refusals] == [(0, "luminosity")]
+            assert c.film.exposures[0] > 0
+        finally:
+            trace.unlink()
@@ -0,0 +1,137 @@
+import math, random
+from concurrent.futures import ProcessPoolExecutor
+
+from camera import Camera, exposure_chart
+
+
+# ----------- Noise models -----------
+
+# Real cameras are not exact. Each tolerance is the standard deviation of a normal distribution:
+#
+# * shutter: error in the time the shutter stays open, in stops
+# * iris: error in the area of the iris opening, in stops
+# * meter: error in the light meter's reading, in stops
+# * battery_sag: drop in battery voltage below its nominal value, in volts; the meter under-reads in proportion
+class Tolerances:
+
+    def __init__(self, shutter=0, iris=0, meter=0, battery_sag=0, battery=1.44):
+        self.shutter = shutter
+        self.iris = iris
+        self.meter = meter
+        self.battery_sag = battery_sag
+        self.battery = battery
+
+
+# ----------- Results -----------
+
+# The distribution of exposure errors (in EV; positive is over-exposed) for one setting, kept as a histogram of
+# bins `resolution` EV wide, so that distributions from many chunks and workers can be merged cheaply.
+class ExposureErrors:
+
+    def __init__(self, resolution=0.01):
+        self.resolution = resolution
+        self.histogram = {}
+        self.count = 0
+        self.blocked = 0
+        self.total = 0
+        self.total_of_squares = 0
+
+    def merge(self, other):
+        for bin, count in other.histogram.items():
+            self.histogram[bin] = self.histogram.get(bin, 0) + count
+        self.count += other.count
+        self.blocked += other.blocked
+        self.total += other.total
+        self.total_of_squares += other.total_of_squares
+        return self
+
+    def mean(self):
+        if not self.count:
+            return
+        return self.total / self.count
+
+    def stdev(self):
+        if not self.count:
+            return
+        return math.sqrt(max(self.total_of_squares / self.count - self.mean() ** 2, 0))
+
+    def quantile(self, q):
+        if not self.count:
+            return
+        target = q * self.count
+        seen = 0
+        for bin in sorted(self.histogram):
+            seen += self.histogram[bin]
+            if seen >= target:
+                return bin * self.resolution
+        return bin * self.resolution
+
+
+# ----------- Simulation -----------
+
+# Simulates `exposures` auto-exposures of a scene at one setting - (film speed, shutter speed, luminosity) - with
+# a random stream of its own. The stream is seeded from the analysis seed, the setting and the chunk number, so
+# that a chunk produces the same results whichever worker process runs it.
+def simulate_chunk(tolerances, setting, exposures, seed, chunk, resolution=0.01):
+    film_speed, shutter_speed, luminosity = setting
+    timer = Camera.selectable_shutter_speeds[shutter_speed]
+    lower, upper = exposure_chart[(film_speed, shutter_speed)]
+    correct = luminosity * film_speed / 12.5
+
+    stream = random.Random(f"{seed}:{film_speed}:{shutter_speed}:{luminosity}:{chunk}")
+    gauss = stream.gauss
+    log2 = math.log2
+
+    errors = ExposureErrors(resolution)
+    histogram = errors.histogram
+    for _ in range(exposures):
+        voltage = tolerances.battery - abs(gauss(0, tolerances.battery_sag))
+        reading = luminosity * 2 ** gauss(0, tolerances.meter) * voltage / tolerances.battery
+
+        # outside the bounds, the exposure bounds lever locks the shutter
+        if not lower <= reading <= upper:
+            errors.blocked += 1
+            continue
+
+        aperture = min(max(math.sqrt(reading * film_speed / 12.5 * timer), 1.7), 16)
+        actual_timer = timer * 2 ** gauss(0, tolerances.shutter)
+        actual_area = 2 ** gauss(0, tolerances.iris) / (aperture * aperture)
+
+        error = log2(correct * actual_timer * actual_area)
+        bin = round(error / resolution)
+        histogram[bin] = histogram.get(bin, 0) + 1
+        errors.total += error
+        errors.total_of_squares += error * error
+
+    errors.count = exposures - errors.blocked
+    return setting, errors
+
+
+class ToleranceAnalysis:
+
+    def __init__(self, tolerances, settings, seed=0, chunk_size=100_000, resolution=0.01):
+        self.tolerances = tolerances
+        self.settings = list(settings)
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.resolution = resolution
+
+    # Runs `exposures` exposures for each setting, split into chunks which are run in `workers` processes (or in
+    # this one, if `workers` is None). Returns the ExposureErrors for each setting.
+    def run(self, exposures, workers=None):
+        jobs = []
+        for setting in self.settings:
+            for chunk, start in enumerate(range(0, exposures, self.chunk_size)):
+                size = min(self.chunk_size, exposures - start)
+                jobs.append((self.tolerances, setting, size, self.seed, chunk, self.resolution))
+
+        if workers is None:
+            results = [simulate_chunk(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(simulate_chunk, *zip(*jobs)))
+
+        distributions = {setting: ExposureErrors(self.resolution) for setting in self.settings}
+        for setting, errors in results:
+            distributions[setting].merge(errors)
+        return distributions
@@ -0,0 +1,125 @@
+import os, mmap, multiprocessing
+from array import array
+from multiprocessing import shared_memory, resource_tracker
+
+from camera import Environment
+
+
+# ----------- Luminosity traces -----------
+
+# A LuminosityTrace is a day (or any length) of scene luminosity, sampled every `interval` seconds. Its samples are
+# kept either in shared memory or in a file, and any number of processes can attach to them read-only, so that the
+# workers of a fleet simulation share a single copy of the trace rather than each loading its own.
+#
+# The process that creates a trace owns it: it should unlink() the trace when it is no longer needed. Other
+# processes attach() using the trace's handle, which is small and cheap to send to them.
+class LuminosityTrace:
+
+    def __init__(self, handle, buffer, owner=False, shared_memory=None, file=None, map=None):
+        self.handle = handle
+        self.interval = handle.interval
+        self.samples = buffer.cast("d").toreadonly()
+        self.owner = owner
+        self._shared_memory = shared_memory
+        self._file = file
+        self._map = map
+
+    @classmethod
+    def in_shared_memory(cls, samples, interval):
+        samples = array("d", samples)
+        memory = shared_memory.SharedMemory(create=True, size=max(len(samples) * samples.itemsize, 1))
+        memory.buf[:len(samples) * samples.itemsize] = samples.tobytes()
+        handle = TraceHandle(len(samples), interval, name=memory.name)
+        return cls(handle, memory.buf[:len(samples) * samples.itemsize], owner=True, shared_memory=memory)
+
+    @classmethod
+    def in_file(cls, path, samples, interval):
+        samples = array("d", samples)
+        with open(path, "wb") as f:
+            samples.tofile(f)
+        trace = cls.attach(TraceHandle(len(samples), interval, path=os.fspath(path)))
+        trace.owner = True
+        return trace
+
+    @classmethod
+    def attach(cls, handle):
+        size = handle.length * 8
+        if handle.path:
+            file = open(handle.path, "rb")
+            map = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+            return cls(handle, memoryview(map), file=file, map=map)
+
+        try:
+            memory = shared_memory.SharedMemory(name=handle.name, track=False)
+        except TypeError:
+            # Before Python 3.13, attaching registers the memory with this process's resource tracker, which
+            # would unlink it when this process exits - but the creating process is responsible for it. A forked
+            # worker shares its parent's tracker, so only a worker that was spawned needs to unregister it.
+            memory = shared_memory.SharedMemory(name=handle.name)
+            if multiprocessing.parent_process() and multiprocessing.get_start_method() != "fork":
+                resource_tracker.unregister(memory._name, "shared_memory")
+        return cls(handle, memory.buf[:size], shared_memory=memory)
+
+    def __len__(self):
+        return len(self.samples)
+
+    # the scene luminosity at the given time; the trace holds each sample until the next, and its first and last
+    # samples before and after it
+    def at(self, time):
+        i = int(time / self.interval)
+        if i < 0:
+            i = 0
+        elif i >= len(self.samples):
+            i = len(self.samples) - 1
+        return self.samples[i]
+
+    def close(self):
+        self.samples.release()
+        if self._shared_memory:
+            self._shared_memory.close()
+        if self._map:
+            self._map.close()
+            self._file.close()
+
+    def unlink(self):
+        self.close()
+        if not self.owner:
+            return
+        if self._shared_memory:
+            self._shared_memory.unlink()
+        else:
+            os.remove(self.handle.path)
+
+
+# Everything a process needs to attach to a trace: where its samples are, and how many there are.
+class TraceHandle:
+
+    def __init__(self, length, interval, name=None, path=None):
+        self.length = length
+        self.interval = interval
+        self.name = name
+        self.path = path
+
+
+# ----------- Environment -----------
+
+# An environment whose scene luminosity follows a trace. The time is either read from a clock (for example, a
+# function returning a Scheduler's `now`), or set on the environment's `time` attribute.
+class TraceEnvironment(Environment):
+
+    def __init__(self, trace, clock=None, time=0):
+        self.trace = trace
+        self.clock = clock
+        self.time = time
+
+    @property
+    def scene_luminosity(self):
+        return self.trace.at(self.clock() if self.clock else self.time)
+
+    # the luminosity is the trace's to decide; setting it is refused, as a camera refuses a setting it doesn't have
+    @scene_luminosity.setter
+    def scene_luminosity(self, value):
+        raise self.LuminosityNotSettable("The scene luminosity follows a trace, and cannot be set")
+
+    def reset(self):
+        self.time = 0